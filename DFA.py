@@ -1,62 +1,96 @@
+from collections import deque
+
+from matcher_cache import get_matcher
+from prefilter import Prefilter
+from spans import mask_spans, select_spans
+
+
 class DFA:
     def __init__(self, words):
         self.words = words
+        self.prefilter = Prefilter(words)
         self.build()
  
     def build(self):
         self.transitions = {}
         self.fails = {}
+        # 每个状态的输出记录: ((词长, 词序号), ...)，包含沿失败链可达的所有词
         self.outputs = {}
+        # 按状态索引子节点，BFS 时只访问当前状态的出边
+        children = {}
         state = 0
-        for word in self.words:
+        for word_id, word in enumerate(self.words):
+            if not word:
+                continue
             current_state = 0
             for char in word:
                 next_state = self.transitions.get((current_state, char), None)
                 if next_state is None:
                     state += 1
                     self.transitions[(current_state, char)] = state
+                    children.setdefault(current_state, []).append((char, state))
                     current_state = state
                 else:
                     current_state = next_state
-            self.outputs[current_state] = word
-        queue = []
-        for (start_state, char), next_state in self.transitions.items():
-            if start_state == 0:
-                queue.append(next_state)
-                self.fails[next_state] = 0
+            if current_state not in self.outputs:
+                self.outputs[current_state] = ((len(word), word_id),)
+        queue = deque()
+        for char, next_state in children.get(0, ()):
+            queue.append(next_state)
+            self.fails[next_state] = 0
         while queue:
-            r_state = queue.pop(0)
-            for (state, char), next_state in self.transitions.items():
-                if state == r_state:
-                    queue.append(next_state)
-                    fail_state = self.fails[state]
-                    while (fail_state, char) not in self.transitions and fail_state != 0:
-                        fail_state = self.fails[fail_state]
-                    self.fails[next_state] = self.transitions.get((fail_state, char), 0)
-                    if self.fails[next_state] in self.outputs:
-                        self.outputs[next_state] += ', ' + self.outputs[self.fails[next_state]]
+            r_state = queue.popleft()
+            for char, next_state in children.get(r_state, ()):
+                queue.append(next_state)
+                fail_state = self.fails[r_state]
+                while (fail_state, char) not in self.transitions and fail_state != 0:
+                    fail_state = self.fails[fail_state]
+                self.fails[next_state] = self.transitions.get((fail_state, char), 0)
+                if self.fails[next_state] in self.outputs:
+                    fail_output = self.outputs[self.fails[next_state]]
+                    if next_state in self.outputs:
+                        self.outputs[next_state] += fail_output
+                    else:
+                        # 没有自身输出的状态直接共享失败状态的记录
+                        self.outputs[next_state] = fail_output
  
     def search(self, text):
-        state = 0
+        return [(start, end) for start, end, _ in self.find_spans(text)]
+ 
+    def find_spans(self, text):
+        """返回所有命中记录 (start, end, word_id)，允许重叠"""
+        if not self.prefilter.may_match(text):
+            return []
+        return self.scan(text)[0]
+ 
+    def scan(self, text, state=0, offset=0):
+        """
+        从给定状态继续扫描文本，返回 (命中记录, 结束状态)
+        offset 为 text 第一个字符在整个输入流中的位置，用于分段输入
+        """
+        transitions = self.transitions
+        fails = self.fails
+        outputs = self.outputs
         result = []
-        for i, char in enumerate(text):
-            while (state, char) not in self.transitions and state != 0:
-                state = self.fails[state]
-            state = self.transitions.get((state, char), 0)
-            if state in self.outputs:
+        for i, char in enumerate(text, offset):
+            next_state = transitions.get((state, char))
+            while next_state is None and state != 0:
+                state = fails[state]
+                next_state = transitions.get((state, char))
+            state = next_state or 0
+            hits = outputs.get(state)
+            if hits:
                 # 处理多个匹配的情况
-                words_found = self.outputs[state].split(', ')
-                for word in words_found:
-                    start_pos = i - len(word) + 1
-                    result.append((start_pos, i))
-        return result
+                for length, word_id in hits:
+                    result.append((i - length + 1, i, word_id))
+        return result, state
+ 
+ 
+def find_spans(text, words, policy='all'):
+    dfa = get_matcher('DFA', words, DFA)
+    return select_spans(dfa.find_spans(text), policy)
  
  
 def DFA_filter_words(text, words):
-    dfa = DFA(words)
-    result = []
-    for start_index, end_index in dfa.search(text):
-        result.append((start_index, end_index))
-    for start_index, end_index in result[::-1]:
-        text = text[:start_index] + '*' * (end_index - start_index + 1) + text[end_index + 1:]
-    return text
+    dfa = get_matcher('DFA', words, DFA)
+    return mask_spans(text, dfa.find_spans(text))
@@ -1,23 +1,41 @@
 import ahocorasick
- 
- 
+
+from matcher_cache import get_matcher
+from prefilter import Prefilter
+from spans import mask_spans, select_spans
+
+
+class AhoCorasickMatcher:
+    def __init__(self, words):
+        self.words = words
+        self.prefilter = Prefilter(words)
+        self.automaton = None
+        if any(words):
+            A = ahocorasick.Automaton()
+            for index, word in enumerate(words):
+                # 重复的词保留第一次出现的序号
+                if word and word not in A:
+                    A.add_word(word, (index, len(word)))
+            A.make_automaton()
+            self.automaton = A
+
+    def find_spans(self, text):
+        """返回所有命中记录 (start, end, word_id)，允许重叠"""
+        if self.automaton is None or not self.prefilter.may_match(text):
+            return []
+        return [(end_index - length + 1, end_index, word_id)
+                for end_index, (word_id, length) in self.automaton.iter(text)]
+
+
+def find_spans(text, words, policy='all'):
+    matcher = get_matcher('aho_corasick', words, AhoCorasickMatcher)
+    return select_spans(matcher.find_spans(text), policy)
+
+
 def aho_corasick_filter_words(text, words):
     # 处理空敏感词列表的情况
     if not words:
         return text
 
-    A = ahocorasick.Automaton()
-    for index, word in enumerate(words):
-        A.add_word(word, (index, word))
-    A.make_automaton()
-
-    result = []
-    for end_index, (_, original_value) in A.iter(text):
-        start_index = end_index - len(original_value) + 1
-        result.append((start_index, end_index))
-
-    for start_index, end_index in result[::-1]:
-        text = text[:start_index] + '*' * (end_index - start_index + 1) + text[end_index + 1:]
-    return text
- 
- 
+    matcher = get_matcher('aho_corasick', words, AhoCorasickMatcher)
+    return mask_spans(text, matcher.find_spans(text))
@@ -12,7 +12,8 @@ import tempfile
 import webbrowser
 import threading
 from datetime import datetime
-from flask import Flask, request, jsonify, render_template, send_file, send_from_directory
+from functools import partial
+from flask import Flask, Response, request, jsonify, render_template, send_file, send_from_directory, stream_with_context
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 # 设置 FFmpeg 路径
@@ -52,6 +53,14 @@ import pyaudio
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # 导入过滤模块
+import engines
+from jobs import JobManager, QueueFullError
+from lexicon import LexiconStore
+from matcher_cache import fingerprint
+from models import ModelManager, DEFAULT_MODEL
+from streaming import STREAMING_ENGINES, SegmentFilter, filter_segments
+from transcripts import TranscriptCache
+from uploads import ALLOWED_EXTENSIONS, find_upload, save_upload
 filter_modules_available = {}
 
 try:
@@ -72,12 +81,9 @@ except ImportError as e:
     print(f"aho_corasick 模块未找到: {e}")
     print("提示: 需要安装 pyahocorasick 库: pip install pyahocorasick")
 
-# 注意：文件名有空格，需要特殊处理
+# 注意：文件名有空格，由 engines 负责加载
 try:
-    import importlib.util
-    spec = importlib.util.spec_from_file_location("trie_tree", "trie tree.py")
-    trie_tree_module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(trie_tree_module)
+    trie_tree_module = engines.load_engine('trie_tree')
     filter_modules_available['trie_tree'] = trie_tree_module
     print("trie tree 模块加载成功")
 except Exception as e:
@@ -90,17 +96,56 @@ try:
 except ImportError as e:
     print(f"replace 模块未找到: {e}")
 
-# 注意：文件名有空格，需要特殊处理
+# 注意：文件名有空格，由 engines 负责加载
 try:
-    import importlib.util
-    spec = importlib.util.spec_from_file_location("regular_expression", "regular expression.py")
-    regular_expression_module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(regular_expression_module)
+    regular_expression_module = engines.load_engine('regular_expression')
     filter_modules_available['regular_expression'] = regular_expression_module
     print("regular expression 模块加载成功")
 except Exception as e:
     print(f"regular expression 模块未找到: {e}")
 
+try:
+    # 稠密转移表 DFA 依赖 numpy
+    import dense_dfa
+    filter_modules_available['dense_dfa'] = dense_dfa
+    print("dense_dfa 模块加载成功")
+except ImportError as e:
+    print(f"dense_dfa 模块未找到: {e}")
+    print("提示: 需要安装 numpy 库: pip install numpy")
+
+try:
+    # 内存映射的扁平 AC 自动机，多个工作进程共享同一份自动机文件
+    import flat_dfa
+    filter_modules_available['flat_dfa'] = flat_dfa
+    print("flat_dfa 模块加载成功")
+except ImportError as e:
+    print(f"flat_dfa 模块未找到: {e}")
+
+try:
+    # 抗干扰匹配（跳过词内的空白、标点和零宽字符）
+    import noise
+    filter_modules_available['noise_dfa'] = noise
+    filter_modules_available['noise_trie'] = noise
+    print("noise 模块加载成功")
+except ImportError as e:
+    print(f"noise 模块未找到: {e}")
+
+try:
+    # 拼音同音匹配依赖 pypinyin
+    import homophone
+    filter_modules_available['pinyin'] = homophone
+    print("homophone 模块加载成功")
+except ImportError as e:
+    print(f"homophone 模块未找到: {e}")
+    print("提示: 需要安装 pypinyin 库: pip install pypinyin")
+
+try:
+    # 音频消音依赖 numpy
+    import bleep
+except ImportError as e:
+    bleep = None
+    print(f"bleep 模块未找到: {e}")
+
 print(f"已加载过滤模块: {list(filter_modules_available.keys())}")
 
 app = Flask(__name__)
@@ -110,33 +155,58 @@ CORS(app)  # 允许跨域请求
 app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024  # 100MB
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['RESULTS_FOLDER'] = 'results'
+app.config['TRANSCRIPTS_FOLDER'] = 'transcripts'
+# 服务端词库文件（每行一个词），修改后自动重新编译并切换版本
+app.config['LEXICON_FILE'] = os.environ.get('LEXICON_FILE', 'lexicon.txt')
+# 设置后，修改词库的管理接口需要在 X-Admin-Token 请求头中提供该值
+app.config['ADMIN_TOKEN'] = os.environ.get('ADMIN_TOKEN')
+# flat_dfa 自动机文件目录，各工作进程 mmap 同一目录下的同一份文件，必须使用绝对路径
+app.config['FLAT_DFA_DIR'] = os.path.abspath(os.environ.get('FLAT_DFA_DIR', os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'artifacts', 'flat')))
+if 'flat_dfa' in filter_modules_available:
+    filter_modules_available['flat_dfa'].FLAT_DIR = app.config['FLAT_DFA_DIR']
+# 服务端词库预先编译的引擎（逗号分隔），默认只编译请求的默认过滤方法 DFA 和多进程共享的 flat_dfa；
+# 其他引擎在第一次使用时按需编译
+app.config['LEXICON_ENGINES'] = [name.strip() for name in os.environ.get('LEXICON_ENGINES', 'DFA,flat_dfa').split(',')
+                                 if name.strip() in filter_modules_available]
+# 服务端词库编译好的匹配器文件目录，启动和重新加载时词库未变就直接读取，不再重新编译
+app.config['LEXICON_ARTIFACT_DIR'] = os.path.abspath(os.environ.get('LEXICON_ARTIFACT_DIR', os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'artifacts', 'lexicon')))
 
 # 创建必要的目录
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['RESULTS_FOLDER'], exist_ok=True)
 
+# 流式转录时每个窗口的长度（秒），Whisper 音频采样率固定为 16kHz
+STREAM_WINDOW_SECONDS = 30
+SAMPLE_RATE = 16000
+
 # 全局变量
-whisper_model = None
 filter_methods = {}
-
-def load_whisper_model():
-    """加载 Whisper 模型"""
-    global whisper_model
-    if whisper_model is None:
-        print("正在加载 Whisper 模型...")
-        try:
-            import whisper
-            whisper_model = whisper.load_model("base")
-            print("Whisper 模型加载成功")
-            return True
-        except ImportError:
-            print("Whisper 未安装，请运行: pip install openai-whisper")
-            return False
-        except Exception as e:
-            print(f"Whisper 模型加载失败: {e}")
-            print("提示: 首次使用需要下载模型文件，请确保网络连接正常")
-            return False
-    return True
+# 已加载的 Whisper 模型，按模型大小在所有请求之间共用
+model_manager = ModelManager(lambda name: whisper.load_model(name), max_resident=2)
+# Whisper 原始转录结果缓存，按音频内容哈希 + 模型 + 语言索引
+transcript_cache = TranscriptCache(app.config['TRANSCRIPTS_FOLDER'])
+# 转录任务队列：同时运行的任务数和等待中的任务数都有上限
+job_manager = JobManager(max_workers=2, max_pending=16)
+# 服务端词库，为配置的过滤引擎预先编译，使用这些引擎的请求不承担编译开销
+lexicon_store = LexiconStore(app.config['LEXICON_FILE'], engine_names=app.config['LEXICON_ENGINES'],
+                             artifact_dir=app.config['LEXICON_ARTIFACT_DIR'])
+
+def load_whisper_model(name=DEFAULT_MODEL):
+    """预加载 Whisper 模型，之后的请求直接复用"""
+    if whisper is None:
+        print("Whisper 未安装，请运行: pip install openai-whisper")
+        return False
+    print("正在加载 Whisper 模型...")
+    try:
+        model_manager.get(name)
+        print("Whisper 模型加载成功")
+        return True
+    except Exception as e:
+        print(f"Whisper 模型加载失败: {e}")
+        print("提示: 首次使用需要下载模型文件，请确保网络连接正常")
+        return False
 
 def initialize_filter_methods():
     """初始化过滤方法"""
@@ -149,7 +219,9 @@ def initialize_filter_methods():
             if hasattr(dfa_module, 'DFA_filter_words'):
                 filter_methods['DFA'] = {
                     'name': 'DFA (确定有限自动机)',
-                    'filter_func': dfa_module.DFA_filter_words
+                    'filter_func': dfa_module.DFA_filter_words,
+                    'find_spans': dfa_module.find_spans,
+                    'filter_many': partial(engines.filter_many, 'DFA')
                 }
                 print("DFA 过滤器初始化成功")
             else:
@@ -164,7 +236,9 @@ def initialize_filter_methods():
             if hasattr(aho_module, 'aho_corasick_filter_words'):
                 filter_methods['aho_corasick'] = {
                     'name': 'Aho-Corasick (AC自动机)',
-                    'filter_func': aho_module.aho_corasick_filter_words
+                    'filter_func': aho_module.aho_corasick_filter_words,
+                    'find_spans': aho_module.find_spans,
+                    'filter_many': partial(engines.filter_many, 'aho_corasick')
                 }
                 print("Aho-Corasick 过滤器初始化成功")
             else:
@@ -179,7 +253,9 @@ def initialize_filter_methods():
             if hasattr(trie_module, 'trie_tree_filter_words'):
                 filter_methods['trie_tree'] = {
                     'name': 'Trie Tree (字典树)',
-                    'filter_func': trie_module.trie_tree_filter_words
+                    'filter_func': trie_module.trie_tree_filter_words,
+                    'find_spans': trie_module.find_spans,
+                    'filter_many': partial(engines.filter_many, 'trie_tree')
                 }
                 print("Trie Tree 过滤器初始化成功")
             else:
@@ -194,7 +270,9 @@ def initialize_filter_methods():
             if hasattr(replace_module, 'replace_filter_words'):
                 filter_methods['replace'] = {
                     'name': 'Replace (字符串替换)',
-                    'filter_func': replace_module.replace_filter_words
+                    'filter_func': replace_module.replace_filter_words,
+                    'find_spans': replace_module.find_spans,
+                    'filter_many': partial(engines.filter_many, 'replace')
                 }
                 print("Replace 过滤器初始化成功")
             else:
@@ -209,7 +287,9 @@ def initialize_filter_methods():
             if hasattr(regex_module, 'regular_expression_filter_words'):
                 filter_methods['regular_expression'] = {
                     'name': 'Regular Expression (正则表达式)',
-                    'filter_func': regex_module.regular_expression_filter_words
+                    'filter_func': regex_module.regular_expression_filter_words,
+                    'find_spans': regex_module.find_spans,
+                    'filter_many': partial(engines.filter_many, 'regular_expression')
                 }
                 print("Regular Expression 过滤器初始化成功")
             else:
@@ -217,6 +297,71 @@ def initialize_filter_methods():
         except Exception as e:
             print(f"Regular Expression 过滤器初始化失败: {e}")
 
+    # NumPy 稠密转移表 DFA 过滤器
+    if 'dense_dfa' in filter_modules_available:
+        try:
+            dense_module = filter_modules_available['dense_dfa']
+            if hasattr(dense_module, 'dense_dfa_filter_words'):
+                filter_methods['dense_dfa'] = {
+                    'name': 'Dense DFA (NumPy 稠密转移表)',
+                    'filter_func': dense_module.dense_dfa_filter_words,
+                    'find_spans': dense_module.find_spans,
+                    'filter_many': partial(engines.filter_many, 'dense_dfa')
+                }
+                print("Dense DFA 过滤器初始化成功")
+            else:
+                print("Dense DFA 模块中未找到 dense_dfa_filter_words 函数")
+        except Exception as e:
+            print(f"Dense DFA 过滤器初始化失败: {e}")
+
+    # 内存映射扁平 AC 自动机过滤器
+    if 'flat_dfa' in filter_modules_available:
+        try:
+            flat_module = filter_modules_available['flat_dfa']
+            filter_methods['flat_dfa'] = {
+                'name': 'Flat DFA (内存映射，多进程共享)',
+                'filter_func': flat_module.flat_dfa_filter_words,
+                'find_spans': flat_module.find_spans,
+                'filter_many': partial(engines.filter_many, 'flat_dfa')
+            }
+            print("Flat DFA 过滤器初始化成功")
+        except Exception as e:
+            print(f"Flat DFA 过滤器初始化失败: {e}")
+
+    # 抗干扰过滤器
+    if 'noise_dfa' in filter_modules_available:
+        try:
+            noise_module = filter_modules_available['noise_dfa']
+            filter_methods['noise_dfa'] = {
+                'name': 'Noise-tolerant DFA (跳过干扰字符)',
+                'filter_func': noise_module.noise_dfa_filter_words,
+                'find_spans': noise_module.find_spans,
+                'filter_many': partial(engines.filter_many, 'noise_dfa')
+            }
+            filter_methods['noise_trie'] = {
+                'name': 'Noise-tolerant Trie (跳过干扰字符)',
+                'filter_func': noise_module.noise_trie_filter_words,
+                'find_spans': noise_module.find_trie_spans,
+                'filter_many': partial(engines.filter_many, 'noise_trie')
+            }
+            print("抗干扰过滤器初始化成功")
+        except Exception as e:
+            print(f"抗干扰过滤器初始化失败: {e}")
+
+    # 拼音同音过滤器
+    if 'pinyin' in filter_modules_available:
+        try:
+            pinyin_module = filter_modules_available['pinyin']
+            filter_methods['pinyin'] = {
+                'name': 'Pinyin (同音字匹配)',
+                'filter_func': pinyin_module.pinyin_filter_words,
+                'find_spans': pinyin_module.find_spans,
+                'filter_many': partial(engines.filter_many, 'pinyin')
+            }
+            print("拼音同音过滤器初始化成功")
+        except Exception as e:
+            print(f"拼音同音过滤器初始化失败: {e}")
+
     # 添加一个简单的默认过滤器
     if not filter_methods:
         filter_methods['simple'] = {
@@ -259,8 +404,12 @@ def health_check():
     return jsonify({
         'status': 'ok',
         'timestamp': datetime.now().isoformat(),
-        'whisper_loaded': whisper_model is not None,
-        'available_filters': list(filter_methods.keys())
+        'whisper_loaded': bool(model_manager.loaded()),
+        'whisper_models': model_manager.stats(),
+        'available_filters': list(filter_methods.keys()),
+        'jobs': job_manager.stats(),
+        'transcripts': transcript_cache.stats(),
+        'lexicon': lexicon_store.current.to_dict()
     })
 
 @app.route('/api/upload', methods=['POST'])
@@ -274,156 +423,552 @@ def upload_audio():
         return jsonify({'error': '没有选择文件'}), 400
     
     # 检查文件类型
-    allowed_extensions = {'.mp3', '.wav', '.m4a', '.flac', '.ogg'}
     file_ext = os.path.splitext(file.filename)[1].lower()
-    if file_ext not in allowed_extensions:
+    if file_ext not in ALLOWED_EXTENSIONS:
         return jsonify({'error': f'不支持的文件格式: {file_ext}'}), 400
     
-    # 保存文件
-    filename = secure_filename(file.filename)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{timestamp}_{filename}"
+    # 分块写入并计算内容哈希，相同内容只保存一份
+    filename, digest, size, existed = save_upload(file.stream, app.config['UPLOAD_FOLDER'], file_ext)
     filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-    file.save(filepath)
-    
+    # 转录缓存直接使用上传时算好的哈希
+    transcript_cache.remember_hash(filepath, digest)
+    if existed:
+        print(f"上传内容已存在，复用: {filename}")
+
     return jsonify({
         'success': True,
         'filename': filename,
+        'original_filename': secure_filename(file.filename),
         'filepath': filepath,
-        'size': os.path.getsize(filepath)
+        'sha256': digest,
+        'size': size,
+        'deduplicated': existed
     })
 
+@app.route('/api/upload/<sha256>', methods=['HEAD', 'GET'])
+def check_upload(sha256):
+    """按内容哈希查询音频是否已上传，已上传时前端可以跳过上传"""
+    file_ext = request.args.get('ext', '').lower()
+    filename = find_upload(app.config['UPLOAD_FOLDER'], sha256, file_ext)
+    if filename is None:
+        return jsonify({'exists': False}), 404
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    transcript_cache.remember_hash(filepath, sha256.lower())
+    return jsonify({
+        'success': True,
+        'exists': True,
+        'filename': filename,
+        'sha256': sha256.lower(),
+        'size': os.path.getsize(filepath),
+        'deduplicated': True
+    })
+
+def parse_process_request(data):
+    """解析并检查处理请求的参数，返回 (参数, 错误响应)"""
+    params = {
+        'audio_file': data.get('audio_file'),
+        'sensitive_words': data.get('sensitive_words', []),
+        'filter_method': data.get('filter_method', 'DFA'),
+        'model_name': data.get('model', DEFAULT_MODEL),
+        'language': data.get('language', 'zh'),
+        # 使用服务端词库代替请求中的 sensitive_words
+        'use_lexicon': bool(data.get('use_lexicon')),
+        # 同时生成消音音频: true / 'tone'（提示音）或 'silence'（静音）
+        'censor_audio': parse_censor_mode(data.get('censor_audio'))
+    }
+
+    if not params['audio_file']:
+        return params, (jsonify({'error': '没有指定音频文件'}), 400)
+
+    # 检查文件是否存在
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], params['audio_file'])
+    if not os.path.exists(filepath):
+        return params, (jsonify({'error': '音频文件不存在'}), 404)
+
+    if whisper is None:
+        return params, (jsonify({'error': 'Whisper 未安装'}), 500)
+    model_name = params['model_name']
+    if hasattr(whisper, 'available_models') and model_name not in whisper.available_models():
+        return params, (jsonify({'error': f'不支持的模型: {model_name}'}), 400)
+    filter_method = params['filter_method']
+    if (params['sensitive_words'] or params['use_lexicon']) and filter_method not in filter_methods:
+        return params, (jsonify({'error': f'不支持的过滤方法: {filter_method}'}), 400)
+    error = censor_error(params['censor_audio'], filter_method)
+    if error:
+        return params, error
+    return params, None
+
+def parse_censor_mode(value):
+    """消音参数: true 表示提示音，字符串为消音方式，未设置时返回 None"""
+    if value is True:
+        return 'tone'
+    return value or None
+
+def censor_error(censor_mode, filter_method):
+    """检查消音参数，返回错误响应或 None"""
+    if censor_mode is None:
+        return None
+    if bleep is None:
+        return jsonify({'error': '音频消音需要安装 numpy'}), 500
+    if censor_mode not in bleep.MODES:
+        return jsonify({'error': f"不支持的消音方式: {censor_mode}，可选: {', '.join(bleep.MODES)}"}), 400
+    if filter_method in filter_methods and 'find_spans' not in filter_methods[filter_method]:
+        return jsonify({'error': f'过滤方法 {filter_method} 不支持音频消音'}), 400
+    return None
+
 @app.route('/api/process', methods=['POST'])
 def process_audio():
-    """处理音频文件 - 使用本地whisper集成的敏感词过滤功能"""
+    """提交音频处理任务，立即返回任务 ID，通过 /api/jobs/<job_id> 查询进度和结果"""
     try:
-        data = request.get_json()
-
-        # 获取参数
-        audio_file = data.get('audio_file')
-        sensitive_words = data.get('sensitive_words', [])
-        filter_method = data.get('filter_method', 'DFA')
-
-        if not audio_file:
-            return jsonify({'error': '没有指定音频文件'}), 400
-
-        # 检查文件是否存在
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], audio_file)
-        if not os.path.exists(filepath):
-            return jsonify({'error': '音频文件不存在'}), 404
+        params, error = parse_process_request(request.get_json() or {})
+        if error:
+            return error
+        job = submit_process_job(params)
+        print(f"已提交处理任务: {job.id}")
+        return jsonify({
+            'success': True,
+            'job_id': job.id,
+            'status': job.status,
+            'status_url': f"/api/jobs/{job.id}"
+        }), 202
 
-        # 开始处理
-        start_time = time.time()
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        print(f"提交任务失败: {e}")
+        return jsonify({'error': f'处理失败: {str(e)}'}), 500
 
-        # 加载模型
-        print(f"加载 Whisper base 模型...")
+def submit_process_job(params, stream=False):
+    """提交转录和过滤任务；队列已满时抛出 QueueFullError"""
+    audio_file = params['audio_file']
+    runner = run_stream_job if stream else run_process_job
+    if params['use_lexicon']:
+        # 提交时取得词库版本，任务在该版本上完成，期间切换版本不受影响
+        version = lexicon_store.acquire()
         try:
-            model = whisper.load_model("base")
-            print("模型加载完成")
-        except Exception as e:
-            print(f"模型加载失败: {e}")
-            return jsonify({'error': f'模型加载失败: {str(e)}'}), 500
+            return job_manager.submit(run_lexicon_job, version, runner, audio_file, params['filter_method'],
+                                      params['model_name'], params['language'], params['censor_audio'],
+                                      description=audio_file)
+        except BaseException:
+            lexicon_store.release(version)
+            raise
+    return job_manager.submit(runner, audio_file, params['sensitive_words'], params['filter_method'],
+                              params['model_name'], params['language'], None, params['censor_audio'],
+                              description=audio_file)
+
+@app.route('/api/process/stream', methods=['POST'])
+def process_audio_stream():
+    """
+    流式处理：每个分段识别并过滤后立即以 JSON 行 (application/x-ndjson) 推送给前端
+    转录在任务队列中运行（与 /api/process 共用并发数和排队上限），响应只跟随任务推送事件；
+    客户端断开后任务继续运行，结果可以通过 /api/jobs/<job_id> 查询
+    """
+    params, error = parse_process_request(request.get_json() or {})
+    if error:
+        return error
+    try:
+        job = submit_process_job(params, stream=True)
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 503
+    print(f"已提交流式处理任务: {job.id}")
+    return Response(stream_with_context(follow_stream_job(job)),
+                    mimetype='application/x-ndjson',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def stream_event(event):
+    return json.dumps(event, ensure_ascii=False, default=float) + '\n'
+
+def follow_stream_job(job):
+    for event in job.follow():
+        yield stream_event(event)
+    if job.status == 'failed':
+        yield stream_event({'type': 'error', 'error': f'处理失败: {job.error}'})
+
+def run_stream_job(job, audio_file, sensitive_words, filter_method, model_name=DEFAULT_MODEL, language='zh',
+                   lexicon_version=None, censor_audio=None):
+    """
+    流式处理任务：依次产出 start / segment / update / done 事件，返回与 run_process_job 相同的结果；
+    update 表示后面的分段完成了一个跨分段的敏感词，之前分段的过滤结果随之变化
+    """
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], audio_file)
+    start_time = time.time()
+    first_segment_time = None
+
+    # 优先使用整段转录的结果；没有时按窗口转录，结果存在单独的键下（准确率较低，/api/process 不会复用）
+    transcript_id = transcript_cache.key(filepath, model_name, language)
+    transcript = transcript_cache.get(transcript_id)
+    if transcript is None:
+        transcript_id = transcript_cache.key(filepath, model_name, language, windowed=True)
+        transcript = transcript_cache.get(transcript_id)
+    job.emit({'type': 'start', 'job_id': job.id, 'transcript_id': transcript_id,
+              'cached': transcript is not None})
+
+    if transcript is not None:
+        segment_iter = iter(transcript['segments'])
+    else:
+        segment_iter = iter_transcript_segments(filepath, model_name, language)
+    if sensitive_words and filter_method in STREAMING_ENGINES:
+        segment_filter = SegmentFilter(sensitive_words, filter_method)
+    else:
+        segment_filter = None
+
+    segments = []
+    for segment in segment_iter:
+        index = len(segments)
+        segments.append(segment)
+        simplified = segment.get('simplified_text', segment['text'])
+        if segment_filter is not None:
+            changes = segment_filter.add(simplified)
+        else:
+            # 其他引擎先按分段过滤，跨分段的命中在最终结果中体现
+            changes = {index: filter_segment_texts([simplified], sensitive_words, filter_method)[0]}
+
+        if first_segment_time is None:
+            first_segment_time = time.time() - start_time
+            print(f"首个分段用时: {first_segment_time:.2f} 秒")
+        for changed_index, filtered in changes.items():
+            if changed_index == index:
+                job.emit({
+                    'type': 'segment',
+                    'index': index,
+                    'start': segment['start'],
+                    'end': segment['end'],
+                    'original': segment.get('original_text', segment['text']),
+                    'simplified': simplified,
+                    'filtered': filtered,
+                    'elapsed': time.time() - start_time
+                })
+            else:
+                job.emit({'type': 'update', 'index': changed_index, 'filtered': filtered})
 
-        # 使用本地whisper的集成敏感词过滤功能进行转录
-        print(f"开始转录音频（集成敏感词过滤）...")
+    if transcript is None:
+        original_text = ''.join(segment.get('original_text', segment['text']) for segment in segments)
+        transcript = {
+            'language': segments[0].get('language', language) if segments else language,
+            'model': model_name,
+            'original_text': original_text,
+            'simplified_text': ''.join(segment.get('simplified_text', segment['text'])
+                                       for segment in segments),
+            'segments': segments,
+            'transcribe_time': time.time() - start_time,
+            'audio_file': audio_file
+        }
+        transcript_cache.put(transcript_id, transcript)
+
+    # 最终结果与 /api/process 一致
+    result_data = build_result(transcript, sensitive_words, filter_method, lexicon_version)
+    if censor_audio:
+        censor_result_audio(result_data, transcript, transcript_id, audio_file, sensitive_words,
+                            filter_method, censor_audio)
+    process_time = time.time() - start_time
+    audio_duration = result_data['audio_duration']
+    real_time_factor = process_time / audio_duration if audio_duration > 0 else 0
+    result_data.update({
+        'audio_file': audio_file,
+        'transcript_id': transcript_id,
+        'model': model_name,
+        'process_time': f"{process_time:.1f}秒",
+        'real_time_factor': f"{real_time_factor:.1f}x",
+        'first_segment_time': f"{first_segment_time or 0:.2f}秒",
+        'mode': 'whisper_stream'
+    })
+    result_data['stats']['processing_speed'] = f"{real_time_factor:.1f}x"
+    result_data['result_file'] = save_result(result_data, job.id[:8])
+    print(f"流式处理完成，耗时: {process_time:.1f}秒")
+    job.emit({
+        'type': 'done',
+        'first_segment_seconds': first_segment_time,
+        'total_seconds': process_time,
+        'result': result_data
+    })
+    return result_data
+
+def iter_transcript_segments(filepath, model_name, language):
+    """按固定长度的窗口转录音频，每个窗口完成后立即产出其中的分段（时间换算到整段音频）"""
+    audio = whisper.load_audio(filepath)
+    window = STREAM_WINDOW_SECONDS * SAMPLE_RATE
+    prompt = None
+    for offset in range(0, len(audio), window):
+        # 每个窗口单独占用模型，其他任务可以在窗口之间使用同一模型
+        with model_manager.use(model_name) as model:
+            result = model.transcribe(audio[offset:offset + window], language=language, verbose=False,
+                                      word_timestamps=True, initial_prompt=prompt)
+        seconds = offset / SAMPLE_RATE
+        for segment in result.get('segments', []):
+            segment['start'] += seconds
+            segment['end'] += seconds
+            for word in segment.get('words') or []:
+                word['start'] += seconds
+                word['end'] += seconds
+            segment.setdefault('language', result.get('language', language))
+            yield segment
+        # 上一窗口的文本作为下一窗口的提示，保持上下文连贯
+        prompt = result.get('text') or None
+
+@app.route('/api/jobs/<job_id>')
+def get_job(job_id):
+    """查询处理任务的状态、进度和结果"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': '任务不存在或已过期'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/refilter', methods=['POST'])
+def refilter_transcript():
+    """在缓存的转录结果上用新的词库或过滤方法重新过滤，不重新识别"""
+    try:
+        data = request.get_json() or {}
+        sensitive_words = data.get('sensitive_words', [])
+        filter_method = data.get('filter_method', 'DFA')
+        use_lexicon = bool(data.get('use_lexicon'))
+        censor_audio = parse_censor_mode(data.get('censor_audio'))
 
-        try:
-            # 传入敏感词和过滤方法进行转录和过滤（与test.py一致）
-            transcribe_params = {
-                "language": "zh",
-                "verbose": True,
-                "word_timestamps": True,
-                "sensitive_words": sensitive_words if sensitive_words else None
-            }
+        # 优先使用 /api/process 返回的 transcript_id，也可以用音频文件 + 模型 + 语言定位
+        transcript_id = data.get('transcript_id')
+        audio_file = data.get('audio_file')
+        if not transcript_id and audio_file:
+            filepath = os.path.join(app.config['UPLOAD_FOLDER'], secure_filename(audio_file))
+            if os.path.exists(filepath):
+                transcript_id = transcript_cache.key(filepath, data.get('model', DEFAULT_MODEL),
+                                                     data.get('language', 'zh'))
+        transcript = transcript_cache.get(transcript_id)
+        if transcript is None:
+            return jsonify({'error': '没有找到转录结果，请先调用 /api/process'}), 404
+        if (sensitive_words or use_lexicon) and filter_method not in filter_methods:
+            return jsonify({'error': f'不支持的过滤方法: {filter_method}'}), 400
+        error = censor_error(censor_audio, filter_method)
+        if error:
+            return error
 
-            # 只有在有敏感词时才传入过滤方法参数
-            if sensitive_words and filter_method:
-                transcribe_params["filter_method"] = filter_method
+        start_time = time.time()
+        audio_file = transcript.get('audio_file', audio_file)
+        if use_lexicon:
+            with lexicon_store.use() as version:
+                result_data = build_result(transcript, version.words, filter_method, version.version)
+                if censor_audio:
+                    censor_result_audio(result_data, transcript, transcript_id, audio_file, version.words,
+                                        filter_method, censor_audio)
+        else:
+            result_data = build_result(transcript, sensitive_words, filter_method)
+            if censor_audio:
+                censor_result_audio(result_data, transcript, transcript_id, audio_file, sensitive_words,
+                                    filter_method, censor_audio)
+        process_time = time.time() - start_time
+        result_data.update({
+            'audio_file': audio_file,
+            'transcript_id': transcript_id,
+            'model': transcript.get('model'),
+            'process_time': f"{process_time * 1000:.1f}毫秒",
+            'mode': 'refilter'
+        })
+        result_data['result_file'] = save_result(result_data, transcript_id[:8])
+        print(f"重新过滤完成，耗时: {process_time * 1000:.1f} 毫秒")
+        return jsonify(result_data)
 
-            result = model.transcribe(filepath, **transcribe_params)
+    except Exception as e:
+        print(f"重新过滤失败: {e}")
+        return jsonify({'error': f'重新过滤失败: {str(e)}'}), 500
 
-            transcribe_time = time.time() - start_time
-            print(f"转录完成，耗时: {transcribe_time:.2f} 秒")
-            print(f"识别语言: {result['language']}")
+def transcribe_audio(job, filepath, model_name, language):
+    """用 Whisper 转录音频（不做过滤），返回可缓存的原始转录结果"""
+    start_time = time.time()
 
-        except Exception as e:
-            print(f"转录失败: {e}")
-            import traceback
-            traceback.print_exc()
-            return jsonify({'error': f'转录失败: {str(e)}'}), 500
-
-        # 处理结果（与test.py一致的数据结构）
-        # 获取基本信息
-        original_text = result.get('original_text', '')
-        simplified_text = result.get('simplified_text', original_text)
-        filtered_text = result.get('text', original_text)  # 本地whisper已经过滤过了
-        segments_data = result.get('segments', [])
-
-        # 计算音频时长
-        audio_duration = segments_data[-1]['end'] if segments_data else 0
-
-        # 处理分段信息
-        segments = []
-        for segment in segments_data:
-            segments.append({
-                'start': segment['start'],
-                'end': segment['end'],
-                'original': segment.get('original_text', segment['text']),
-                'simplified': segment.get('simplified_text', segment['text']),
-                'filtered': segment['text']  # 本地whisper已经过滤过了
-            })
-
-        # 计算统计信息
-        process_time = time.time() - start_time
-        real_time_factor = process_time / audio_duration if audio_duration > 0 else 0
+    # 获取模型（已加载的模型直接复用）
+    job.update(5, f'准备 Whisper {model_name} 模型...')
+    try:
+        model_manager.get(model_name)
+    except Exception as e:
+        print(f"模型加载失败: {e}")
+        raise RuntimeError(f'模型加载失败: {str(e)}')
 
-        # 统计敏感词数量
-        sensitive_word_count = 0
-        if sensitive_words:
-            for word in sensitive_words:
-                sensitive_word_count += original_text.count(word)
+    job.update(15, '正在进行语音识别...')
+    print(f"开始转录音频...")
 
-        # 生成结果
-        result_data = {
-            'success': True,
-            'audio_file': audio_file,
-            'language': result.get('language', 'zh'),
-            'duration': f"{int(audio_duration // 60):02d}:{int(audio_duration % 60):02d}",
-            'process_time': f"{process_time:.1f}秒",
-            'real_time_factor': f"{real_time_factor:.1f}x",
-            'filter_method': filter_method,
-            'filter_method_name': filter_method,
-            'original_text': original_text,
-            'simplified_text': simplified_text,
-            'filtered_text': filtered_text,
-            'segments': segments,
-            'stats': {
-                'segment_count': len(segments),
-                'sensitive_word_count': sensitive_word_count,
-                'accuracy_rate': '95%',
-                'processing_speed': f"{real_time_factor:.1f}x"
-            },
-            'timestamp': datetime.now().isoformat(),
-            'mode': 'whisper_integrated'
+    try:
+        # 过滤在转录之后单独进行，转录结果可以在不同词库和过滤方法之间复用
+        transcribe_params = {
+            "language": language,
+            "verbose": True,
+            "word_timestamps": True
         }
 
-        # 保存结果到文件
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        result_filename = f"result_{timestamp}.json"
-        result_filepath = os.path.join(app.config['RESULTS_FOLDER'], result_filename)
+        # 同一模型实例同一时间只给一个任务使用
+        with model_manager.use(model_name) as model:
+            result = model.transcribe(filepath, **transcribe_params)
 
-        with open(result_filepath, 'w', encoding='utf-8') as f:
-            json.dump(result_data, f, ensure_ascii=False, indent=2)
+        transcribe_time = time.time() - start_time
+        print(f"转录完成，耗时: {transcribe_time:.2f} 秒")
+        print(f"识别语言: {result['language']}")
 
-        result_data['result_file'] = result_filename
+    except Exception as e:
+        print(f"转录失败: {e}")
+        import traceback
+        traceback.print_exc()
+        raise RuntimeError(f'转录失败: {str(e)}')
+
+    original_text = result.get('original_text', result.get('text', ''))
+    return {
+        'language': result.get('language', language),
+        'model': model_name,
+        'original_text': original_text,
+        'simplified_text': result.get('simplified_text', original_text),
+        'segments': result.get('segments', []),
+        'transcribe_time': transcribe_time
+    }
+
+def filter_segment_texts(texts, sensitive_words, filter_method):
+    """过滤各分段文本；支持流式过滤的引擎可以匹配跨分段的敏感词"""
+    if not sensitive_words:
+        return list(texts)
+    if filter_method in STREAMING_ENGINES:
+        return filter_segments(texts, sensitive_words, filter_method)
+    # 其他引擎过滤拼接后的全文，屏蔽不改变长度，按原分段长度切回各分段
+    filtered = filter_methods[filter_method]['filter_func'](''.join(texts), sensitive_words)
+    result = []
+    position = 0
+    for text in texts:
+        result.append(filtered[position:position + len(text)])
+        position += len(text)
+    return result
+
+def build_result(transcript, sensitive_words, filter_method, lexicon_version=None):
+    """用指定的词库和过滤方法过滤转录结果，生成返回给前端的数据"""
+    segments_data = transcript.get('segments', [])
+    simplified_texts = [segment.get('simplified_text', segment['text']) for segment in segments_data]
+    filtered_texts = filter_segment_texts(simplified_texts, sensitive_words, filter_method)
+
+    # 计算音频时长
+    audio_duration = segments_data[-1]['end'] if segments_data else 0
+
+    # 处理分段信息
+    segments = []
+    for segment, simplified, filtered in zip(segments_data, simplified_texts, filtered_texts):
+        segments.append({
+            'start': segment['start'],
+            'end': segment['end'],
+            'original': segment.get('original_text', segment['text']),
+            'simplified': simplified,
+            'filtered': filtered
+        })
+
+    # 统计敏感词数量
+    simplified_text = ''.join(simplified_texts)
+    sensitive_word_count = 0
+    if sensitive_words:
+        find_spans = filter_methods.get(filter_method, {}).get('find_spans')
+        if find_spans:
+            sensitive_word_count = len(find_spans(simplified_text, sensitive_words, 'all'))
+        else:
+            for word in sensitive_words:
+                sensitive_word_count += simplified_text.count(word)
 
-        print(f"处理完成，耗时: {process_time:.1f}秒")
-        return jsonify(result_data)
+    result = {
+        'success': True,
+        'language': transcript.get('language', 'zh'),
+        'duration': f"{int(audio_duration // 60):02d}:{int(audio_duration % 60):02d}",
+        'audio_duration': audio_duration,
+        'filter_method': filter_method,
+        'filter_method_name': filter_method,
+        'original_text': transcript.get('original_text', ''),
+        'simplified_text': transcript.get('simplified_text', simplified_text),
+        'filtered_text': ''.join(filtered_texts),
+        'segments': segments,
+        'stats': {
+            'segment_count': len(segments),
+            'sensitive_word_count': sensitive_word_count,
+            'accuracy_rate': '95%'
+        },
+        'timestamp': datetime.now().isoformat()
+    }
+    if lexicon_version is not None:
+        result['lexicon_version'] = lexicon_version
+    return result
+
+def save_result(result_data, suffix):
+    """保存结果到文件，返回文件名"""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    result_filename = f"result_{timestamp}_{suffix}.json"
+    result_filepath = os.path.join(app.config['RESULTS_FOLDER'], result_filename)
+
+    with open(result_filepath, 'w', encoding='utf-8') as f:
+        json.dump(result_data, f, ensure_ascii=False, indent=2)
+    return result_filename
+
+def censor_result_audio(result_data, transcript, transcript_id, audio_file, sensitive_words, filter_method, mode):
+    """
+    按过滤命中对原音频消音，写出 WAV 到结果目录，文件名记录在 result_data['censored_audio']；
+    相同的转录结果、词库、过滤方法和消音方式只生成一次
+    """
+    key = fingerprint([transcript_id, fingerprint(list(sensitive_words)), filter_method, mode])
+    filename = f"censored_{key}.wav"
+    output_path = os.path.join(app.config['RESULTS_FOLDER'], filename)
+    if not os.path.exists(output_path):
+        segments = transcript.get('segments', [])
+        simplified_text = ''.join(segment.get('simplified_text', segment['text']) for segment in segments)
+        spans = []
+        if sensitive_words:
+            spans = filter_methods[filter_method]['find_spans'](simplified_text, sensitive_words, 'all')
+        start_time = time.time()
+        stats = bleep.censor_audio(os.path.join(app.config['UPLOAD_FOLDER'], audio_file), segments, spans,
+                                   output_path, mode)
+        print(f"消音音频已生成: {filename}，{len(stats['intervals'])} 处共 {stats['censored_seconds']:.1f} 秒,"
+              f" 耗时 {time.time() - start_time:.2f} 秒")
+    result_data['censored_audio'] = filename
+    return filename
+
+def run_lexicon_job(job, version, runner, audio_file, filter_method, model_name, language, censor_audio=None):
+    """使用服务端词库运行 run_process_job 或 run_stream_job，任务结束后释放词库版本"""
+    try:
+        return runner(job, audio_file, version.words, filter_method, model_name, language,
+                      version.version, censor_audio)
+    finally:
+        lexicon_store.release(version)
+
+def run_process_job(job, audio_file, sensitive_words, filter_method, model_name=DEFAULT_MODEL, language='zh',
+                    lexicon_version=None, censor_audio=None):
+    """处理音频文件：转录（命中缓存时跳过）后按词库过滤（在任务线程中运行）"""
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], audio_file)
+
+    # 开始处理
+    start_time = time.time()
+
+    # 同一音频、模型和语言的转录结果只计算一次
+    transcript_id = transcript_cache.key(filepath, model_name, language)
+    transcript = transcript_cache.get(transcript_id)
+    if transcript is not None:
+        print(f"命中转录缓存: {transcript_id}")
+    else:
+        transcript = transcribe_audio(job, filepath, model_name, language)
+        transcript['audio_file'] = audio_file
+        transcript_cache.put(transcript_id, transcript)
+
+    job.update(85, '正在过滤敏感词...')
+    result_data = build_result(transcript, sensitive_words, filter_method, lexicon_version)
+    if censor_audio:
+        job.update(90, '正在生成消音音频...')
+        censor_result_audio(result_data, transcript, transcript_id, audio_file, sensitive_words,
+                            filter_method, censor_audio)
+
+    # 计算统计信息
+    process_time = time.time() - start_time
+    audio_duration = result_data['audio_duration']
+    real_time_factor = process_time / audio_duration if audio_duration > 0 else 0
+    result_data.update({
+        'audio_file': audio_file,
+        'transcript_id': transcript_id,
+        'model': model_name,
+        'process_time': f"{process_time:.1f}秒",
+        'real_time_factor': f"{real_time_factor:.1f}x",
+        'mode': 'whisper_transcript'
+    })
+    result_data['stats']['processing_speed'] = f"{real_time_factor:.1f}x"
 
-    except Exception as e:
-        print(f"处理失败: {e}")
-        return jsonify({'error': f'处理失败: {str(e)}'}), 500
+    # 保存结果到文件
+    job.update(95, '正在保存结果...')
+    result_data['result_file'] = save_result(result_data, job.id[:8])
 
+    print(f"处理完成，耗时: {process_time:.1f}秒")
+    return result_data
 @app.route('/api/download/<result_type>/<filename>')
 def download_result(result_type, filename):
     """下载结果文件"""
@@ -432,6 +977,12 @@ def download_result(result_type, filename):
             filepath = os.path.join(app.config['RESULTS_FOLDER'], filename)
             if os.path.exists(filepath):
                 return send_file(filepath, as_attachment=True)
+
+        elif result_type == 'audio':
+            # 消音后的音频
+            filepath = os.path.join(app.config['RESULTS_FOLDER'], secure_filename(filename))
+            if filepath.endswith('.wav') and os.path.exists(filepath):
+                return send_file(os.path.abspath(filepath), as_attachment=True)
         
         elif result_type == 'txt':
             # 生成文本格式结果
@@ -495,6 +1046,44 @@ def generate_txt_result(data):
     
     return content
 
+def admin_error():
+    """检查管理接口的令牌，未配置 ADMIN_TOKEN 时不做检查"""
+    token = app.config['ADMIN_TOKEN']
+    if token and request.headers.get('X-Admin-Token') != token:
+        return jsonify({'error': '没有权限'}), 403
+    return None
+
+@app.route('/api/lexicon', methods=['GET'])
+def get_lexicon():
+    """查看服务端词库的当前版本和编译状态，include_words=1 时返回词表"""
+    info = lexicon_store.stats()
+    if request.args.get('include_words'):
+        info['words'] = lexicon_store.current.words
+    return jsonify(info)
+
+@app.route('/api/lexicon', methods=['PUT'])
+def update_lexicon():
+    """替换服务端词库：写入词库文件并在后台编译，编译完成后切换版本"""
+    error = admin_error()
+    if error:
+        return error
+    words = (request.get_json() or {}).get('words')
+    if not isinstance(words, list) or not all(isinstance(word, str) for word in words):
+        return jsonify({'error': 'words 必须是字符串列表'}), 400
+    lexicon_store.save(words)
+    return jsonify({'success': True, **lexicon_store.stats()}), 202
+
+@app.route('/api/lexicon/reload', methods=['POST'])
+def reload_lexicon():
+    """立即重新读取词库文件（不等待文件监视线程）"""
+    error = admin_error()
+    if error:
+        return error
+    if not os.path.exists(app.config['LEXICON_FILE']):
+        return jsonify({'error': '词库文件不存在'}), 404
+    lexicon_store.reload()
+    return jsonify({'success': True, **lexicon_store.stats()}), 202
+
 @app.route('/api/filters')
 def get_available_filters():
     """获取可用的过滤方法"""
@@ -512,6 +1101,9 @@ if __name__ == '__main__':
     initialize_filter_methods()
     print(f"可用过滤方法: {list(filter_methods.keys())}")
 
+    # 监视词库文件的修改
+    lexicon_store.start_watching()
+
     # 预加载 Whisper 模型
     load_whisper_model()
 
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+编译好的匹配器磁盘文件
+把词库编译后的自动机/字典树/正则序列化到磁盘，启动时和工作进程中直接加载，不再重新构建。
+文件格式: 魔数 | 头部长度 (4 字节) | JSON 头部 | pickle 数据
+头部记录格式版本、引擎、引擎源码哈希、词库指纹和数据校验和，任一项不符即视为过期并重新编译。
+注意: 加载使用 pickle，只应加载本机生成的文件
+
+用法:
+    python artifacts.py compile words.txt --engine DFA aho_corasick
+    python artifacts.py info artifacts/DFA_<指纹>.swfa
+"""
+
+import os
+import sys
+import json
+import time
+import pickle
+import struct
+import types
+import hashlib
+import argparse
+import importlib.metadata
+from functools import lru_cache
+
+import engines
+from atomic import atomic_write
+from matcher_cache import fingerprint, get_matcher
+
+MAGIC = b'SWFA'
+FORMAT_VERSION = 1
+ARTIFACT_DIR = 'artifacts'
+ARTIFACT_SUFFIX = '.swfa'
+_HEADER_LENGTH = struct.Struct('>I')
+
+
+class StaleArtifactError(Exception):
+    """文件不存在、已损坏或与当前词库/代码不一致"""
+
+
+def read_words(path):
+    """读取词库文件，每行一个词，忽略空行"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def engine_dependencies(engine):
+    """
+    引擎依赖的本项目源文件和第三方包: 从引擎模块出发，沿模块全局变量引用的模块、类和函数递归查找
+    （例如 noise_trie 依赖 trie tree.py，pinyin 依赖 pypinyin）
+    """
+    base = os.path.dirname(os.path.abspath(__file__))
+    files = set()
+    packages = set()
+    pending = [engines.load_engine(engine)]
+    seen = set()
+    while pending:
+        module = pending.pop()
+        if module.__name__ in seen:
+            continue
+        seen.add(module.__name__)
+        path = getattr(module, '__file__', None)
+        if not path or os.path.dirname(os.path.abspath(path)) != base:
+            top = module.__name__.partition('.')[0]
+            if top not in sys.stdlib_module_names and top != 'builtins':
+                packages.add(top)
+            continue
+        files.add(os.path.abspath(path))
+        for value in vars(module).values():
+            name = value.__name__ if isinstance(value, types.ModuleType) else getattr(value, '__module__', None)
+            if isinstance(name, str) and name in sys.modules:
+                pending.append(sys.modules[name])
+    return sorted(files), sorted(packages)
+
+
+@lru_cache(maxsize=None)
+def package_version(package):
+    distributions = importlib.metadata.packages_distributions().get(package)
+    if distributions:
+        try:
+            return importlib.metadata.version(distributions[0])
+        except importlib.metadata.PackageNotFoundError:
+            pass
+    return str(getattr(sys.modules.get(package), '__version__', None))
+
+
+def engine_version(engine):
+    """引擎依赖的源码和第三方包版本的哈希，代码或依赖版本变化后旧文件自动失效"""
+    files, packages = engine_dependencies(engine)
+    sha = hashlib.sha256()
+    for path in files:
+        sha.update(os.path.basename(path).encode('utf-8') + b'\x00')
+        with open(path, 'rb') as f:
+            sha.update(f.read())
+    for package in packages:
+        sha.update(f"{package}=={package_version(package)}\x00".encode('utf-8'))
+    return sha.hexdigest()[:16]
+
+
+def artifact_path(engine, words, folder=ARTIFACT_DIR):
+    return os.path.join(folder, f"{engine}_{fingerprint(list(words))}{ARTIFACT_SUFFIX}")
+
+
+def save_artifact(engine, words, matcher, path):
+    """序列化编译好的匹配器，返回头部信息"""
+    payload = pickle.dumps(matcher, pickle.HIGHEST_PROTOCOL)
+    header = {
+        'format_version': FORMAT_VERSION,
+        'engine': engine,
+        'engine_version': engine_version(engine),
+        'fingerprint': fingerprint(list(words)),
+        'word_count': len(words),
+        'payload_bytes': len(payload),
+        'sha256': hashlib.sha256(payload).hexdigest(),
+        'created_at': time.time()
+    }
+    header_bytes = json.dumps(header).encode('utf-8')
+    # 原子替换，避免其他进程读到写了一半的文件
+    with atomic_write(path) as f:
+        f.write(MAGIC)
+        f.write(_HEADER_LENGTH.pack(len(header_bytes)))
+        f.write(header_bytes)
+        f.write(payload)
+    return header
+
+
+def read_header(path):
+    """读取头部，返回 (头部, 数据起始位置)"""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise StaleArtifactError(f"不是匹配器文件: {path}")
+        try:
+            (length,) = _HEADER_LENGTH.unpack(f.read(_HEADER_LENGTH.size))
+            header = json.loads(f.read(length).decode('utf-8'))
+        except (struct.error, ValueError) as e:
+            raise StaleArtifactError(f"头部已损坏: {path}") from e
+    return header, len(MAGIC) + _HEADER_LENGTH.size + length
+
+
+def load_artifact(engine, words, path):
+    """加载并校验匹配器文件，过期或损坏时抛出 StaleArtifactError"""
+    if not os.path.exists(path):
+        raise StaleArtifactError(f"文件不存在: {path}")
+    header, offset = read_header(path)
+    expected = {
+        'format_version': FORMAT_VERSION,
+        'engine': engine,
+        'engine_version': engine_version(engine),
+        'fingerprint': fingerprint(list(words))
+    }
+    for key, value in expected.items():
+        if header.get(key) != value:
+            raise StaleArtifactError(f"{key} 不一致: 文件 {header.get(key)}, 当前 {value}")
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        payload = f.read()
+    if hashlib.sha256(payload).hexdigest() != header['sha256']:
+        raise StaleArtifactError(f"校验和不一致: {path}")
+    try:
+        return pickle.loads(payload)
+    except (OSError, ValueError, EOFError, pickle.UnpicklingError) as e:
+        # 例如 flat_dfa 引用的 .swfm 文件已被删除或与词库不一致
+        raise StaleArtifactError(f"无法加载 {path}: {e}") from e
+
+
+def build_matcher(engine, words, path):
+    """编译匹配器；flat_dfa 的数据保存在单独的 .swfm 文件中，与匹配器文件放在同一目录"""
+    module = engines.load_engine(engine)
+    if engine == 'flat_dfa':
+        return module.FlatAutomaton(words, module.flat_path(words, os.path.dirname(os.path.abspath(path))))
+    return getattr(module, engines.ENGINES[engine][1])(words)
+
+
+def compile_artifact(engine, words, path=None):
+    """编译词库并写入文件，返回 (文件路径, 头部信息)"""
+    words = list(words)
+    path = path or artifact_path(engine, words)
+    matcher = build_matcher(engine, words, path)
+    return path, save_artifact(engine, words, matcher, path)
+
+
+def load_or_compile(engine, words, path=None):
+    """优先从文件加载，文件过期时重新编译并覆盖"""
+    words = list(words)
+    path = path or artifact_path(engine, words)
+    try:
+        return load_artifact(engine, words, path)
+    except StaleArtifactError as e:
+        print(f"重新编译 {engine} 匹配器: {e}")
+    matcher = build_matcher(engine, words, path)
+    save_artifact(engine, words, matcher, path)
+    return matcher
+
+
+def get_artifact_matcher(engine, words, path=None):
+    """
+    获取匹配器并放入进程内缓存，之后各模块的过滤函数直接命中缓存；
+    只有缓存未命中时才读取文件
+    """
+    return get_matcher(engine, words, lambda words: load_or_compile(engine, words, path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='编译敏感词匹配器到磁盘')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    compile_parser = subparsers.add_parser('compile', help='编译词库文件（每行一个词）')
+    compile_parser.add_argument('words', help='词库文件')
+    compile_parser.add_argument('--engine', nargs='+', default=['DFA'],
+                                help=f"过滤引擎: {', '.join(engines.ENGINES)}")
+    compile_parser.add_argument('--output-dir', default=ARTIFACT_DIR, help='输出目录')
+
+    info_parser = subparsers.add_parser('info', help='查看文件头部信息')
+    info_parser.add_argument('paths', nargs='+')
+
+    args = parser.parse_args()
+    if args.command == 'compile':
+        words = read_words(args.words)
+        for engine in args.engine:
+            start = time.time()
+            path, header = compile_artifact(engine, words, artifact_path(engine, words, args.output_dir))
+            print(f"{engine}: {len(words)} 个词, 编译 {time.time() - start:.2f} 秒,"
+                  f" {header['payload_bytes'] / 1024 / 1024:.1f} MB -> {path}")
+    else:
+        for path in args.paths:
+            header, _ = read_header(path)
+            print(f"{path}: {json.dumps(header, ensure_ascii=False)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+原子写文件
+先在目标目录中写一个唯一的临时文件，写完后用 os.replace 替换目标文件，
+其他线程和进程要么读到旧文件，要么读到完整的新文件，不会读到写了一半的内容
+"""
+
+import os
+import stat
+import tempfile
+from contextlib import contextmanager
+
+# 进程的 umask（只能通过设置再恢复读取，在导入时读取一次）
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def _target_mode(path):
+    # 替换已有文件时沿用它的权限，新文件按 umask 创建（mkstemp 固定为 0600）
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+
+@contextmanager
+def atomic_write(path, mode='wb', encoding=None):
+    """
+    用法: with atomic_write(path, 'w', encoding='utf-8') as f: ...
+    临时文件由 mkstemp 创建，多个线程同时写同一路径也不会冲突；写入出错时删除临时文件
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, mode, encoding=encoding) as f:
+            yield f
+        os.chmod(temp_path, _target_mode(path))
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
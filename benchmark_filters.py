@@ -0,0 +1,524 @@
+#!/usr/bin/env python3
+"""
+过滤算法基准测试脚本（不依赖 Whisper）
+用随机生成的中文词库和文本测试各过滤引擎的构建与扫描耗时
+
+用法:
+    python benchmark_filters.py build search mask trie dense parallel regex replace prefilter workers incremental noise pinyin
+"""
+
+import gc
+import os
+import glob
+import json
+import sys
+import time
+import re
+import random
+import argparse
+import itertools
+import math
+import tempfile
+import multiprocessing
+import tracemalloc
+
+import DFA
+import engines
+import artifacts
+import flat_dfa
+import incremental
+import noise
+try:
+    import homophone
+except ImportError:
+    homophone = None
+import parallel
+import replace
+from prefilter import Prefilter
+from spans import mask_spans
+
+try:
+    import dense_dfa
+except ImportError:
+    dense_dfa = None
+
+# 文件名有空格，由 engines 负责加载（与各引擎共用同一个模块）
+trie_tree = engines.load_engine('trie_tree')
+regular_expression = engines.load_engine('regular_expression')
+
+# 常用汉字区间，用于生成随机词库和文本
+CJK_START = 0x4e00
+CJK_RANGE = 3000
+
+
+def random_words(count, min_len=2, max_len=4, seed=0):
+    """生成指定数量的不重复随机中文词"""
+    rng = random.Random(seed)
+    words = set()
+    while len(words) < count:
+        length = rng.randint(min_len, max_len)
+        words.add(''.join(chr(CJK_START + rng.randrange(CJK_RANGE)) for _ in range(length)))
+    return sorted(words)
+
+
+def random_text(length, seed=0):
+    """生成指定长度的随机中文文本"""
+    rng = random.Random(seed)
+    return ''.join(chr(CJK_START + rng.randrange(CJK_RANGE)) for _ in range(length))
+
+
+def measure_memory(func, *args):
+    """返回构建结果常驻的内存（字节）"""
+    gc.collect()
+    tracemalloc.start()
+    result = func(*args)
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, result
+
+
+def timed(func, *args, repeat=1):
+    """返回多次运行中的最短耗时（秒）和最后一次的结果"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def bench_build(args):
+    """测试用例：DFA 构建耗时随词库规模的变化"""
+    print("DFA 构建耗时")
+    print("-" * 50)
+    for count in (1000, 10000, 100000):
+        words = random_words(count)
+        total_chars = sum(len(word) for word in words)
+        elapsed, dfa = timed(DFA.DFA, words)
+        print(f"  词库 {count:>6} 个 / {total_chars:>7} 字符: {elapsed * 1000:9.1f} ms"
+              f"  (状态数 {len(dfa.fails) + 1})")
+
+
+def bench_search(args):
+    """测试用例：命中密集文本上的 DFA 扫描耗时"""
+    print("DFA 扫描耗时（命中密集文本）")
+    print("-" * 50)
+    words = random_words(1000)
+    rng = random.Random(1)
+    # 文本由词库中的词首尾相接构成，每个词都会命中
+    text = ''.join(rng.choice(words) for _ in range(100000 // 3))
+    dfa = DFA.DFA(words)
+    elapsed, spans = timed(dfa.search, text, repeat=3)
+    print(f"  文本 {len(text)} 字符, 命中 {len(spans)} 处: {elapsed * 1000:9.1f} ms")
+
+
+def legacy_mask(text, spans):
+    """原先各模块使用的倒序切片替换"""
+    for start_index, end_index in spans[::-1]:
+        text = text[:start_index] + '*' * (end_index - start_index + 1) + text[end_index + 1:]
+    return text
+
+
+def bench_mask(args):
+    """测试用例：屏蔽替换耗时（切片重建 vs 单次拼接）"""
+    print("屏蔽替换耗时（每 100 字符约 1 处命中）")
+    print("-" * 50)
+    for length in (10000, 100000, 1000000):
+        text = random_text(length)
+        rng = random.Random(2)
+        spans = sorted((start, start + rng.randint(1, 3))
+                       for start in rng.sample(range(length - 4), length // 100))
+        legacy_time, legacy_result = timed(legacy_mask, text, spans)
+        new_time, new_result = timed(mask_spans, text, spans, repeat=3)
+        assert legacy_result == new_result
+        print(f"  文本 {length:>7} 字符 / {len(spans):>5} 处命中: 切片重建 {legacy_time * 1000:9.1f} ms,"
+              f" 单次拼接 {new_time * 1000:7.1f} ms")
+
+
+def bench_trie(args):
+    """测试用例：字典树内存与扫描吞吐（TreeNode 字典树 vs 双数组字典树）"""
+    print("字典树内存与扫描吞吐（20 万词词库）")
+    print("-" * 50)
+    words = random_words(200000)
+    rng = random.Random(3)
+    text = ''.join(rng.choice(words) if rng.random() < 0.1 else random_text(3, seed=i)
+                   for i in range(100000 // 3))
+    for name, builder in (('Tree', trie_tree.build_tree), ('DoubleArrayTrie', trie_tree.DoubleArrayTrie)):
+        build_time, _ = timed(builder, words)
+        memory, matcher = measure_memory(builder, words)
+        scan_time, spans = timed(matcher.find_spans, text, repeat=3)
+        print(f"  {name:<16} 构建 {build_time:6.2f} s, 内存 {memory / 1024 / 1024:7.1f} MB,"
+              f" 扫描 {len(text) / scan_time / 1000:7.0f} K字符/秒 (命中 {len(spans)} 处)")
+        del matcher
+
+
+def bench_dense(args):
+    """测试用例：NumPy 稠密表批量扫描 vs 逐段 DFA 扫描"""
+    print("批量扫描耗时（50 词词库）")
+    print("-" * 50)
+    if dense_dfa is None:
+        print("  需要安装 numpy")
+        return
+    words = random_words(50)
+    rng = random.Random(4)
+    segments = [random_text(rng.randint(10, 50), seed=i) + rng.choice(words) for i in range(10000)]
+    long_text = ''.join(segments)
+    dfa = DFA.DFA(words)
+    dense = dense_dfa.DenseDFA(words)
+    cases = (
+        (f"{len(segments)} 段 Whisper 分段",
+         lambda: [dfa.find_spans(segment) for segment in segments],
+         lambda: dense.find_spans_batch(segments)),
+        (f"单段长文本 {len(long_text)} 字符",
+         lambda: dfa.find_spans(long_text),
+         lambda: dense.find_spans(long_text)),
+    )
+    for name, serial, batch in cases:
+        serial_time, serial_result = timed(serial, repeat=3)
+        batch_time, batch_result = timed(batch, repeat=3)
+        assert serial_result == batch_result
+        print(f"  {name}: DFA {serial_time * 1000:8.1f} ms, 稠密表 {batch_time * 1000:8.1f} ms")
+
+
+def bench_parallel(args):
+    """测试用例：长文本多进程分块扫描的加速比"""
+    cpu_count = os.cpu_count() or 1
+    print(f"长文本多进程分块扫描（本机 {cpu_count} 核）")
+    print("-" * 50)
+    words = random_words(1000)
+    rng = random.Random(5)
+    text = ''.join(rng.choice(words) if rng.random() < 0.05 else random_text(3, seed=i)
+                   for i in range(2000000 // 3))
+    dfa = DFA.DFA(words)
+    serial_time, serial_result = timed(dfa.find_spans, text)
+    print(f"  文本 {len(text)} 字符, 串行 DFA: {serial_time * 1000:8.1f} ms")
+    worker_counts = sorted({1, 2, 4, 8, cpu_count})
+    for workers in worker_counts:
+        with parallel.ParallelScanner('DFA', words, workers=workers) as scanner:
+            # 预热: 启动工作进程并传输自动机
+            scanner.find_spans(text[:parallel.CHUNK_SIZE * workers + 1])
+            elapsed, result = timed(scanner.find_spans, text)
+        assert result == sorted(serial_result)
+        print(f"  {workers} 个进程: {elapsed * 1000:8.1f} ms, 加速比 {serial_time / elapsed:5.2f}x")
+
+
+def bench_regex(args):
+    """测试用例：正则编译与扫描耗时（平铺多选 vs 前缀合并）"""
+    print("正则编译与扫描耗时（10 万字符文本，约 5% 位置命中）")
+    print("-" * 50)
+    for count in (100, 1000, 10000, 50000):
+        words = random_words(count, seed=6)
+        rng = random.Random(6)
+        text = ''.join(rng.choice(words) if rng.random() < 0.05 else random_text(3, seed=i)
+                       for i in range(100000 // 3))
+        results = []
+        for name, builder in (('平铺多选', regular_expression.flat_pattern), ('前缀合并', regular_expression.trie_pattern)):
+            re.purge()
+            compile_time, pattern = timed(lambda: re.compile(builder(words)))
+            scan_time, spans = timed(lambda: [match.span() for match in pattern.finditer(text)])
+            results.append(spans)
+            print(f"  词库 {count:>5} 个 {name}: 编译 {compile_time * 1000:8.1f} ms,"
+                  f" 扫描 {scan_time * 1000:8.1f} ms (命中 {len(spans)} 处)")
+        assert results[0] == results[1]
+
+
+def legacy_replace(sorted_words, text):
+    """原先的替换法: 每个位置依次尝试全部词"""
+    result = []
+    i = 0
+    while i < len(text):
+        for word, word_id in sorted_words:
+            if text.startswith(word, i):
+                result.append((i, i + len(word) - 1, word_id))
+                i += len(word)
+                break
+        else:
+            i += 1
+    return result
+
+
+def bench_replace(args):
+    """测试用例：替换法逐词尝试 vs 首字符分桶"""
+    print("替换法扫描耗时（2 万字符文本，约 5% 位置命中）")
+    print("-" * 50)
+    for count in (100, 1000, 10000):
+        words = random_words(count, seed=7)
+        rng = random.Random(7)
+        text = ''.join(rng.choice(words) if rng.random() < 0.05 else random_text(3, seed=i)
+                       for i in range(20000 // 3))
+        matcher = replace.ReplaceMatcher(words)
+        legacy_time, legacy_result = timed(legacy_replace, matcher.sorted_words, text)
+        bucket_time, bucket_result = timed(matcher.find_longest, text, repeat=3)
+        assert legacy_result == bucket_result
+        print(f"  词库 {count:>5} 个: 逐词尝试 {legacy_time * 1000:9.1f} ms,"
+              f" 首字符分桶 {bucket_time * 1000:6.1f} ms (命中 {len(bucket_result)} 处)")
+
+
+def zipf_segments(count, seed=0):
+    """按 Zipf 分布生成随机中文分段，常用字出现频率远高于生僻字，接近真实转录文本"""
+    rng = random.Random(seed)
+    chars = [chr(CJK_START + index) for index in range(CJK_RANGE)]
+    cumulative = list(itertools.accumulate(1 / (rank + 1) for rank in range(CJK_RANGE)))
+    return [''.join(rng.choices(chars, cum_weights=cumulative, k=rng.randint(8, 30)))
+            for _ in range(count)]
+
+
+def stored_segments():
+    """读取已保存的转录结果（transcripts/ 与 results/）中的分段文本"""
+    segments = []
+    for path in glob.glob('transcripts/*.json') + glob.glob('results/*.json'):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            continue
+        for segment in data.get('segments', []):
+            text = segment.get('simplified_text') or segment.get('simplified') or segment.get('text')
+            if text:
+                segments.append(text)
+    return segments
+
+
+class _NoPrefilter:
+    def may_match(self, text):
+        return True
+
+
+NO_PREFILTER = _NoPrefilter()
+
+
+def bench_prefilter(args):
+    """测试用例：首字符预过滤的跳过比例与节省的时间"""
+    segments = stored_segments()
+    if segments:
+        source = f"已保存的转录结果 {len(segments)} 段"
+    else:
+        segments = zipf_segments(20000, seed=8)
+        source = f"没有已保存的转录结果，使用 Zipf 分布随机分段 {len(segments)} 段"
+    print(f"首字符预过滤（{source}）")
+    print("-" * 50)
+    engine_names = [name for name in engines.ENGINES if name != 'dense_dfa']
+    for count in (3, 50, 500):
+        # 敏感词通常不是高频字组成的，词库从全部常用字中均匀抽取
+        words = random_words(count, seed=8)
+        prefilter = Prefilter(words)
+        skipped = sum(1 for segment in segments if not prefilter.may_match(segment))
+        check_time, _ = timed(lambda: [prefilter.may_match(segment) for segment in segments], repeat=3)
+        print(f"  词库 {count:>3} 个: 跳过 {skipped / len(segments):6.1%} 的分段,"
+              f" 预过滤本身 {check_time * 1000:.1f} ms")
+        for name in engine_names:
+            try:
+                matcher = engines.compile_engine(name, words)
+            except ImportError:
+                continue
+            with_time, with_result = timed(lambda: [matcher.find_spans(text) for text in segments], repeat=3)
+            # 临时关闭预过滤（匹配器在缓存中共享，测完恢复）
+            matcher.prefilter = NO_PREFILTER
+            try:
+                without_time, without_result = timed(lambda: [matcher.find_spans(text) for text in segments],
+                                                     repeat=3)
+            finally:
+                matcher.prefilter = prefilter
+            assert with_result == without_result
+            print(f"    {name:<20} 无预过滤 {without_time * 1000:8.1f} ms, 预过滤 {with_time * 1000:8.1f} ms")
+
+
+def process_memory():
+    """返回当前进程的 (RSS, PSS)，单位字节（读取 /proc/self/smaps_rollup，仅 Linux）"""
+    values = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[0] in ('Rss:', 'Pss:'):
+                values[parts[0][:-1]] = int(parts[1]) * 1024
+    return values['Rss'], values['Pss']
+
+
+def _memory_worker(kind, path, words, text, barrier, queue):
+    # 统计结束前保持匹配器存活
+    matcher = None
+    if kind == 'flat':
+        matcher = flat_dfa.FlatAutomaton.from_file(path)
+    elif kind == 'dict':
+        matcher = artifacts.load_or_compile('DFA', words, path)
+    if matcher is not None:
+        matcher.find_spans(text)
+    # 所有进程都加载完成后再统计，PSS 才能反映共享情况
+    barrier.wait()
+    queue.put(process_memory())
+    barrier.wait()
+
+
+def bench_workers(args):
+    """测试用例：多个工作进程的内存占用（各自加载 DFA vs 共享 mmap 扁平自动机）"""
+    print("工作进程内存占用（10 万词词库，spawn 启动的独立进程）")
+    print("-" * 50)
+    words = random_words(100000)
+    rng = random.Random(9)
+    text = ''.join(rng.choice(words) if rng.random() < 0.1 else random_text(3, seed=i)
+                   for i in range(100000 // 3))
+    context = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as folder:
+        paths = {
+            'none': None,
+            'dict': artifacts.compile_artifact('DFA', words, os.path.join(folder, 'dfa.swfa'))[0],
+            'flat': flat_dfa.FlatAutomaton(words, os.path.join(folder, 'dfa.swfm')).path,
+        }
+        for kind, name in (('none', '不加载词库（基线）'), ('dict', 'DFA (每个进程一份)'),
+                           ('flat', 'mmap 扁平自动机')):
+            for workers in (1, 8):
+                barrier = context.Barrier(workers)
+                queue = context.Queue()
+                processes = [context.Process(target=_memory_worker,
+                                             args=(kind, paths[kind], words, text, barrier, queue))
+                             for _ in range(workers)]
+                for process in processes:
+                    process.start()
+                results = [queue.get() for _ in processes]
+                for process in processes:
+                    process.join()
+                rss = sum(result[0] for result in results) / workers
+                pss = sum(result[1] for result in results)
+                print(f"  {name:<18} {workers} 个进程: 平均 RSS {rss / 1024 / 1024:7.1f} MB,"
+                      f" PSS 合计 {pss / 1024 / 1024:7.1f} MB")
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def bench_incremental(args):
+    """测试用例：10 万词词库上逐个增删词的延迟，与整体重建比较"""
+    words = random_words(100000, seed=9)
+    new_words = [word + '新' for word in random_words(200, seed=10)]
+    text = random_text(20000, seed=9)
+    print("增量增删词（10 万词词库，每次操作后立即可查询）")
+    print("-" * 50)
+    for engine in incremental.INCREMENTAL_ENGINES:
+        try:
+            matcher_class = getattr(engines.load_engine(engine), engines.ENGINES[engine][1])
+        except ImportError:
+            continue
+        rebuild_time, _ = timed(matcher_class, words)
+        matcher = incremental.IncrementalMatcher(words, engine, background=False)
+        for name, operation, targets in (('添加', matcher.add, new_words),
+                                         ('删除', matcher.remove, words[:200] + new_words)):
+            latencies = []
+            for word in targets:
+                start = time.perf_counter()
+                operation(word)
+                latencies.append(time.perf_counter() - start)
+            print(f"  {engine:<14} {name} {len(targets)} 个词: 中位数 {percentile(latencies, 0.5) * 1000:7.3f} ms,"
+                  f" p99 {percentile(latencies, 0.99) * 1000:7.3f} ms, 最大 {max(latencies) * 1000:8.1f} ms")
+        print(f"  {engine:<14} 整体重建 {rebuild_time * 1000:8.1f} ms, 状态 {matcher.stats()}")
+        reference = matcher_class([word for word in words + new_words if word in matcher])
+        scan_time, spans = timed(matcher.find_spans, text, repeat=3)
+        base_time, expected = timed(reference.find_spans, text, repeat=3)
+        assert sorted((start, end) for start, end, _ in spans) == sorted((start, end) for start, end, _ in expected)
+        print(f"  {engine:<14} 扫描 {len(text)} 字: 增量 {scan_time * 1000:.1f} ms, 重建后 {base_time * 1000:.1f} ms")
+
+
+def strip_then_scan(matcher, ignorable, text):
+    """对照实现：先生成去掉干扰字符的副本和位置表，扫描后映射回原文"""
+    positions = [i for i, char in enumerate(text) if char not in ignorable]
+    stripped = ''.join(text[i] for i in positions)
+    return [(positions[start], positions[end], word_id) for start, end, word_id in matcher.find_spans(stripped)]
+
+
+def noise_regex(words, ignorable):
+    """对照实现：每两个字符之间插入 [干扰字符]* 的正则"""
+    gap = f"[{''.join(re.escape(char) for char in sorted(ignorable))}]*"
+    alternatives = (gap.join(re.escape(char) for char in word)
+                    for word in sorted(set(words), key=len, reverse=True) if word)
+    return re.compile('|'.join(alternatives))
+
+
+def bench_noise(args):
+    """测试用例：抗干扰匹配与预先去除干扰字符、正则展开的比较"""
+    text = ''.join(char + ('，' if i % 7 == 6 else ' ' if i % 11 == 10 else '')
+                   for i, char in enumerate(random_text(50000, seed=11)))
+    print(f"抗干扰匹配（{len(text)} 字，含空格和逗号）")
+    print("-" * 50)
+    for count in (100, 1000, 10000):
+        words = random_words(count, seed=11)
+        plain = DFA.DFA(words)
+        tolerant = noise.NoiseTolerantDFA(words)
+        tolerant_trie = noise.NoiseTolerantTrie(words)
+        plain_time, plain_spans = timed(plain.find_spans, text, repeat=3)
+        noise_time, noise_spans = timed(tolerant.find_spans, text, repeat=3)
+        trie_time, trie_spans = timed(tolerant_trie.find_spans, text, repeat=3)
+        strip_time, strip_spans = timed(strip_then_scan, plain, tolerant.ignorable, text, repeat=3)
+        assert sorted(noise_spans) == sorted(strip_spans) == sorted(trie_spans)
+        regex_build, pattern = timed(noise_regex, words, tolerant.ignorable)
+        regex_time, _ = timed(lambda: pattern.findall(text))
+        print(f"  词库 {count:>5} 个: 命中 精确 {len(plain_spans)} / 抗干扰 {len(noise_spans)}")
+        print(f"    精确 DFA {plain_time * 1000:8.1f} ms, 抗干扰 DFA {noise_time * 1000:8.1f} ms,"
+              f" 抗干扰 Trie {trie_time * 1000:8.1f} ms")
+        print(f"    先去除干扰字符 {strip_time * 1000:8.1f} ms,"
+              f" 正则展开 {regex_time * 1000:8.1f} ms (编译 {regex_build * 1000:.1f} ms, 只找不重叠命中)")
+
+
+def bench_pinyin(args):
+    """测试用例：拼音音节匹配与枚举同音写法的比较"""
+    if homophone is None:
+        print("跳过拼音测试: 未安装 pypinyin")
+        return
+    text = random_text(20000, seed=12)
+    print(f"拼音同音匹配（{len(text)} 字）")
+    print("-" * 50)
+    convert_time, syllables = timed(homophone.convert, text)
+    print(f"  文本转换为音节: {convert_time * 1000:.1f} ms（下面的扫描时间不含转换）")
+    # 常用汉字范围内每个读音对应的所有字，用于估算枚举同音写法的规模
+    homophones = {}
+    for code in range(CJK_START, CJK_START + CJK_RANGE):
+        char = chr(code)
+        homophones.setdefault(homophone.convert(char)[0], []).append(char)
+    for count in (100, 1000, 10000):
+        words = random_words(count, seed=12)
+        build_time, matcher = timed(homophone.PinyinMatcher, words)
+        scan_time, (spans, _) = timed(matcher.dfa.scan, syllables, repeat=3)
+        exact_build, exact = timed(DFA.DFA, words)
+        exact_time, exact_spans = timed(exact.find_spans, text, repeat=3)
+        variants = sum(math.prod(len(homophones.get(syllable, ' ')) for syllable in word)
+                       for word in matcher.syllable_words)
+        print(f"  词库 {count:>5} 个: 拼音 构建 {build_time * 1000:8.1f} ms, 扫描 {scan_time * 1000:6.1f} ms,"
+              f" 命中 {len(spans)}; 精确 DFA 构建 {exact_build * 1000:7.1f} ms,"
+              f" 扫描 {exact_time * 1000:6.1f} ms, 命中 {len(exact_spans)}")
+        print(f"    枚举同音写法需要 {variants:,} 个词")
+
+
+BENCHMARKS = {
+    'build': bench_build,
+    'search': bench_search,
+    'mask': bench_mask,
+    'trie': bench_trie,
+    'dense': bench_dense,
+    'parallel': bench_parallel,
+    'regex': bench_regex,
+    'replace': bench_replace,
+    'prefilter': bench_prefilter,
+    'workers': bench_workers,
+    'incremental': bench_incremental,
+    'noise': bench_noise,
+    'pinyin': bench_pinyin,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='过滤算法基准测试')
+    parser.add_argument('benchmark', nargs='*', default=list(BENCHMARKS),
+                        help=f"要运行的测试: {', '.join(BENCHMARKS)}")
+    args = parser.parse_args()
+
+    for name in args.benchmark:
+        if name not in BENCHMARKS:
+            print(f"未知测试: {name}")
+            sys.exit(1)
+        BENCHMARKS[name](args)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+音频消音
+把过滤命中的字符区间按 Whisper 词级时间戳换算成音频区间，在解码后的 16kHz 单声道 16 位 PCM 上
+用 NumPy 切片原地写入提示音或静音，再分块写出 WAV 文件。
+整段音频只在内存中保存一份解码结果（一小时约 110 MB），消音和写出都不产生额外的完整副本
+"""
+
+import wave
+import subprocess
+from bisect import bisect_right
+
+import numpy as np
+
+from atomic import atomic_write
+
+SAMPLE_RATE = 16000
+# 每次写出的采样数
+WRITE_BLOCK_SAMPLES = SAMPLE_RATE * 10
+# 消音区间前后各扩展的秒数，弥补词级时间戳的误差
+PADDING_SECONDS = 0.05
+# 提示音频率 (Hz) 和幅度（相对满幅）
+TONE_FREQUENCY = 1000
+TONE_AMPLITUDE = 0.3
+MODES = ('tone', 'silence')
+# ffmpeg 每次读取的字节数
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+def load_pcm(path, sample_rate=SAMPLE_RATE):
+    """
+    解码为可写的 int16 单声道 PCM 数组
+    已经是目标格式的 WAV 文件直接读取，其他格式通过 ffmpeg 解码（与 Whisper 相同）
+    """
+    try:
+        with wave.open(path, 'rb') as f:
+            if (f.getnchannels(), f.getsampwidth(), f.getframerate()) == (1, 2, sample_rate):
+                # 按块读入预分配的缓冲区
+                buffer = bytearray(f.getnframes() * 2)
+                view = memoryview(buffer)
+                position = 0
+                while position < len(buffer):
+                    data = f.readframes(READ_CHUNK_SIZE // 2)
+                    if not data:
+                        break
+                    view[position:position + len(data)] = data
+                    position += len(data)
+                return np.frombuffer(buffer, dtype=np.int16, count=position // 2)
+    except (wave.Error, EOFError):
+        pass
+
+    command = ['ffmpeg', '-nostdin', '-threads', '0', '-i', path,
+               '-f', 's16le', '-ac', '1', '-acodec', 'pcm_s16le', '-ar', str(sample_rate), '-']
+    buffer = bytearray()
+    with subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL) as process:
+        for chunk in iter(lambda: process.stdout.read(READ_CHUNK_SIZE), b''):
+            buffer += chunk
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg 解码失败: {path}")
+    # bytearray 上的视图是可写的，消音直接修改这块内存
+    return np.frombuffer(buffer, dtype=np.int16, count=len(buffer) // 2)
+
+
+def char_times(segments):
+    """
+    转录结果中简体文本每个字符的 (开始时间, 结束时间)，按分段顺序拼接
+    有词级时间戳时取字符所在词的时间，否则在分段时间内按字符位置线性插值
+    """
+    starts = []
+    ends = []
+    for segment in segments:
+        text = segment.get('simplified_text', segment['text'])
+        words = [word for word in segment.get('words') or [] if word.get('word')]
+        if not words:
+            duration = (segment['end'] - segment['start']) / max(len(text), 1)
+            for i in range(len(text)):
+                starts.append(segment['start'] + i * duration)
+                ends.append(segment['start'] + (i + 1) * duration)
+            continue
+        # 词的文本拼接后对应分段原文；简繁转换可能改变长度，按比例对应位置
+        offsets = []
+        length = 0
+        for word in words:
+            offsets.append(length)
+            length += len(word['word'])
+        scale = length / len(text) if text else 1
+        for i in range(len(text)):
+            word = words[bisect_right(offsets, int(i * scale)) - 1]
+            starts.append(word['start'])
+            ends.append(word['end'])
+    return starts, ends
+
+
+def spans_to_intervals(spans, starts, ends, sample_rate=SAMPLE_RATE, padding=PADDING_SECONDS):
+    """命中的字符区间 -> 合并后的采样区间 [(起点, 终点)]，终点不包含"""
+    intervals = []
+    for span in spans:
+        start, end = span[0], span[1]
+        if end < start:
+            continue
+        first = max(int((starts[start] - padding) * sample_rate), 0)
+        last = int((ends[end] + padding) * sample_rate)
+        intervals.append((first, last))
+    intervals.sort()
+    merged = []
+    for first, last in intervals:
+        if merged and first <= merged[-1][1]:
+            if last > merged[-1][1]:
+                merged[-1][1] = last
+        else:
+            merged.append([first, last])
+    return [tuple(interval) for interval in merged]
+
+
+def bleep_pcm(pcm, intervals, mode='tone', sample_rate=SAMPLE_RATE,
+              frequency=TONE_FREQUENCY, amplitude=TONE_AMPLITUDE):
+    """在 PCM 数组上原地消音，返回消音的采样总数"""
+    if mode not in MODES:
+        raise ValueError(f"未知的消音方式: {mode}，可选: {', '.join(MODES)}")
+    intervals = [(first, min(last, len(pcm))) for first, last in intervals if first < len(pcm)]
+    if not intervals:
+        return 0
+    tone = None
+    if mode == 'tone':
+        # 按最长区间生成一次提示音，各区间切片复制
+        longest = max(last - first for first, last in intervals)
+        tone = (np.sin(np.arange(longest) * (2 * np.pi * frequency / sample_rate))
+                * (amplitude * 32767)).astype(np.int16)
+    total = 0
+    for first, last in intervals:
+        if tone is None:
+            pcm[first:last] = 0
+        else:
+            pcm[first:last] = tone[:last - first]
+        total += last - first
+    return total
+
+
+def write_wav(path, pcm, sample_rate=SAMPLE_RATE, block_samples=WRITE_BLOCK_SAMPLES):
+    """分块写出 16 位单声道 WAV（每块是原数组的视图，不复制）"""
+    with atomic_write(path) as output, wave.open(output, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        for position in range(0, len(pcm), block_samples):
+            f.writeframes(pcm[position:position + block_samples])
+
+
+def censor_audio(audio_path, segments, spans, output_path, mode='tone', padding=PADDING_SECONDS):
+    """按命中区间消音并写出 WAV 文件，返回统计信息"""
+    starts, ends = char_times(segments)
+    intervals = spans_to_intervals(spans, starts, ends, SAMPLE_RATE, padding)
+    pcm = load_pcm(audio_path)
+    censored = bleep_pcm(pcm, intervals, mode)
+    write_wav(output_path, pcm)
+    return {
+        'intervals': [(first / SAMPLE_RATE, last / SAMPLE_RATE) for first, last in intervals],
+        'censored_seconds': censored / SAMPLE_RATE,
+        'audio_seconds': len(pcm) / SAMPLE_RATE,
+        'mode': mode
+    }
@@ -0,0 +1,163 @@
+"""
+NumPy 稠密转移表 DFA
+把 AC 自动机展开成 [状态数, 字符类数] 的整数转移表，字符先映射到紧凑的等价类编号，
+多段文本拼接后切成等宽的行，所有行按列同时推进，一次批量调用完成扫描
+"""
+
+from collections import deque
+
+import numpy as np
+
+from DFA import DFA
+from matcher_cache import get_matcher
+from spans import mask_spans, select_spans
+
+# 转移表允许占用的最大内存，超出时拒绝编译（应改用 DFA 或 aho_corasick）
+MAX_TABLE_BYTES = 256 * 1024 * 1024
+# 每行负责的字符数，长文本会被切成多行并行推进
+ROW_WIDTH = 1024
+
+
+class DenseDFA:
+    def __init__(self, words, max_table_bytes=MAX_TABLE_BYTES):
+        self.words = words
+        self.build(max_table_bytes)
+
+    def build(self, max_table_bytes):
+        dfa = DFA(self.words)
+        num_states = len(dfa.fails) + 1
+        # 等价类: 在 AC 自动机中每个词库字符的转移列都不相同，
+        # 其余字符的转移全部回到根状态，合并为 0 号类
+        chars = sorted({char for _, char in dfa.transitions})
+        num_classes = len(chars) + 1
+        char_classes = {char: index for index, char in enumerate(chars, 1)}
+        # 码位 -> 字符类的查找表，覆盖到词库中最大的码位
+        class_dtype = np.uint16 if num_classes <= np.iinfo(np.uint16).max else np.int32
+        self.char_table = np.zeros(ord(chars[-1]) + 1 if chars else 1, dtype=class_dtype)
+        for char, char_class in char_classes.items():
+            self.char_table[ord(char)] = char_class
+
+        dtype = np.uint16 if num_states <= np.iinfo(np.uint16).max else np.int32
+        table_bytes = num_states * num_classes * np.dtype(dtype).itemsize
+        if table_bytes > max_table_bytes:
+            raise ValueError(f"转移表需要 {table_bytes / 1024 / 1024:.1f} MB，"
+                             f"超过上限 {max_table_bytes / 1024 / 1024:.1f} MB，请改用 DFA 或 aho_corasick")
+
+        children = {}
+        for (state, char), next_state in dfa.transitions.items():
+            children.setdefault(state, []).append((char_classes[char], next_state))
+
+        # 按 BFS 顺序填表: 先继承失败状态的整行，再覆盖自身的转移
+        table = np.zeros((num_states, num_classes), dtype=dtype)
+        for char_class, next_state in children.get(0, ()):
+            table[0, char_class] = next_state
+        queue = deque(next_state for _, next_state in children.get(0, ()))
+        while queue:
+            state = queue.popleft()
+            table[state] = table[dfa.fails[state]]
+            for char_class, next_state in children.get(state, ()):
+                table[state, char_class] = next_state
+                queue.append(next_state)
+
+        self.table = table
+        self.outputs = dfa.outputs
+        self.prefilter = dfa.prefilter
+        self.has_output = np.zeros(num_states, dtype=bool)
+        self.has_output[list(dfa.outputs)] = True
+        self.max_length = max((len(word) for word in self.words), default=0)
+
+    def classify(self, text):
+        """把文本转换为字符类编号数组，词库中未出现的字符为 0"""
+        code_points = np.frombuffer(text.encode('utf-32-le', 'surrogatepass'), dtype=np.uint32)
+        max_code = len(self.char_table) - 1
+        classes = self.char_table[np.minimum(code_points, max_code)]
+        # 超出查找表范围的码位被截断到最后一项，需要单独清零
+        classes[code_points > max_code] = 0
+        return classes
+
+    def find_spans(self, text):
+        """返回所有命中记录 (start, end, word_id)，允许重叠"""
+        return self.find_spans_batch([text])[0]
+
+    def find_spans_batch(self, texts):
+        """批量扫描多段文本，返回与 texts 一一对应的命中记录列表"""
+        texts = list(texts)
+        results = [[] for _ in texts]
+        # 只扫描可能有命中的文本
+        indexes = [index for index, text in enumerate(texts) if self.prefilter.may_match(text)]
+        if not indexes:
+            return results
+        if len(indexes) < len(texts):
+            for index, spans in zip(indexes, self.find_spans_batch([texts[index] for index in indexes])):
+                results[index] = spans
+            return results
+
+        # 各段文本之间插入一个 0 类分隔符（任意状态遇到 0 类都回到根状态），拼成一个序列
+        lengths = np.array([len(text) for text in texts], dtype=np.intp)
+        offsets = np.concatenate(([0], np.cumsum(lengths + 1)[:-1]))
+        sequence = self.classify('\x00'.join(texts))
+        sequence[offsets[1:] - 1] = 0
+        total = len(sequence)
+        if total == 0:
+            return results
+
+        # 序列切成等宽的行，相邻行重叠 (最长词长 - 1) 个字符，保证跨行的词在后一行完整出现
+        row_width = min(ROW_WIDTH, total)
+        overlap = max(self.max_length - 1, 0)
+        row_starts = np.arange(0, total, row_width, dtype=np.intp)
+        scan_starts = np.maximum(row_starts - overlap, 0)
+        width = row_width + overlap
+        padded = np.concatenate((sequence, np.zeros(width, dtype=sequence.dtype)))
+        # 按列存放，逐列推进时访问连续内存
+        columns = padded[np.arange(width, dtype=np.intp)[:, None] + scan_starts]
+
+        table = self.table
+        has_output = self.has_output
+        states = np.zeros(len(row_starts), dtype=np.intp)
+        hit_columns = []
+        hit_rows = []
+        hit_states = []
+        for column in range(width):
+            states = table[states, columns[column]]
+            rows = np.flatnonzero(has_output[states])
+            if len(rows):
+                hit_columns.append(np.full(len(rows), column, dtype=np.intp))
+                hit_rows.append(rows)
+                hit_states.append(states[rows])
+        if not hit_rows:
+            return results
+
+        rows = np.concatenate(hit_rows)
+        ends = scan_starts[rows] + np.concatenate(hit_columns)
+        hit_states = np.concatenate(hit_states)
+        # 每个位置只由负责它的那一行报告，避免重叠部分重复
+        own = (ends >= row_starts[rows]) & (ends < row_starts[rows] + row_width)
+        ends = ends[own]
+        hit_states = hit_states[own]
+        order = np.argsort(ends, kind='stable')
+        ends = ends[order]
+        hit_states = hit_states[order]
+        text_indexes = np.searchsorted(offsets, ends, side='right') - 1
+        local_ends = ends - offsets[text_indexes]
+
+        outputs = self.outputs
+        for text_index, end_index, state in zip(text_indexes.tolist(), local_ends.tolist(),
+                                                hit_states.tolist()):
+            for length, word_id in outputs[state]:
+                results[text_index].append((end_index - length + 1, end_index, word_id))
+        return results
+
+
+def find_spans(text, words, policy='all'):
+    dfa = get_matcher('dense_dfa', words, DenseDFA)
+    return select_spans(dfa.find_spans(text), policy)
+
+
+def find_spans_batch(texts, words, policy='all'):
+    dfa = get_matcher('dense_dfa', words, DenseDFA)
+    return [select_spans(spans, policy) for spans in dfa.find_spans_batch(texts)]
+
+
+def dense_dfa_filter_words(text, words):
+    dfa = get_matcher('dense_dfa', words, DenseDFA)
+    return mask_spans(text, dfa.find_spans(text))
@@ -0,0 +1,107 @@
+"""
+过滤引擎注册表
+按名称加载各过滤模块（包括文件名带空格的模块），获取编译好的匹配器，
+并提供批量过滤入口 filter_many
+"""
+
+import os
+import sys
+import importlib
+import importlib.util
+from functools import partial
+from itertools import islice
+
+from matcher_cache import get_matcher
+from spans import mask_spans, select_spans
+
+# 引擎名称 -> (模块文件, 匹配器类, 过滤函数默认的重叠策略)
+ENGINES = {
+    'DFA': ('DFA.py', 'DFA', 'all'),
+    'aho_corasick': ('aho_corasick.py', 'AhoCorasickMatcher', 'all'),
+    'trie_tree': ('trie tree.py', 'DoubleArrayTrie', 'all'),
+    'replace': ('replace.py', 'ReplaceMatcher', 'leftmost-longest'),
+    'regular_expression': ('regular expression.py', 'RegexMatcher', 'leftmost-longest'),
+    'dense_dfa': ('dense_dfa.py', 'DenseDFA', 'all'),
+    'flat_dfa': ('flat_dfa.py', 'FlatAutomaton', 'all'),
+    'noise_dfa': ('noise.py', 'NoiseTolerantDFA', 'all'),
+    'noise_trie': ('noise.py', 'NoiseTolerantTrie', 'all'),
+    'pinyin': ('homophone.py', 'PinyinMatcher', 'all'),
+}
+
+# 交给执行器时每个任务包含的文本数，词库按任务序列化一次
+BATCH_SIZE = 256
+
+
+def load_engine(engine):
+    """按引擎名称加载过滤模块，注册到 sys.modules 以便在子进程中反序列化"""
+    if engine not in ENGINES:
+        raise ValueError(f"未知的过滤引擎: {engine}")
+    if engine in sys.modules:
+        return sys.modules[engine]
+    filename = ENGINES[engine][0]
+    if ' ' not in filename:
+        return importlib.import_module(filename[:-len('.py')])
+    # 注意：文件名有空格，需要特殊处理
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), filename)
+    spec = importlib.util.spec_from_file_location(engine, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[engine] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[engine]
+        raise
+    return module
+
+
+def compile_engine(engine, words):
+    """获取引擎编译好的匹配器（与各模块的过滤函数共用同一份缓存）"""
+    module = load_engine(engine)
+    return get_matcher(engine, words, getattr(module, ENGINES[engine][1]))
+
+
+def default_policy(engine):
+    return ENGINES[engine][2]
+
+
+def scan(matcher, text, policy):
+    """用编译好的匹配器扫描文本，返回按策略筛选后的命中记录"""
+    if policy == 'leftmost-longest' and hasattr(matcher, 'find_longest'):
+        return matcher.find_longest(text)
+    return select_spans(matcher.find_spans(text), policy)
+
+
+def _filter_batch(engine, words, policy, texts):
+    matcher = compile_engine(engine, words)
+    if hasattr(matcher, 'find_spans_batch'):
+        all_spans = [select_spans(spans, policy) for spans in matcher.find_spans_batch(texts)]
+    else:
+        all_spans = [scan(matcher, text, policy) for text in texts]
+    return [(mask_spans(text, spans), spans) for text, spans in zip(texts, all_spans)]
+
+
+def _batches(texts, size):
+    iterator = iter(texts)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def filter_many(engine, texts, words, policy=None, executor=None, batch_size=BATCH_SIZE):
+    """
+    批量过滤多段文本，词库只编译一次
+    返回与 texts 一一对应的 (过滤后文本, 命中记录) 列表；
+    传入 executor（线程池或进程池）时按批次并行处理
+    """
+    if policy is None:
+        policy = default_policy(engine)
+    if executor is None:
+        return _filter_batch(engine, list(words), policy, list(texts))
+
+    task = partial(_filter_batch, engine, list(words), policy)
+    results = []
+    for batch_result in executor.map(task, _batches(texts, batch_size)):
+        results.extend(batch_result)
+    return results
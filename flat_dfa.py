@@ -0,0 +1,238 @@
+"""
+内存映射的扁平 AC 自动机
+自动机保存为连续的整数数组（CSR 格式），以只读方式 mmap 到内存：
+多个 Flask/gunicorn 工作进程打开同一个文件时，通过页缓存共享同一份物理内存。
+文件按本机字节序写入，只在生成它的同类机器上使用
+
+文件格式（均为 uint32）:
+    头部: 魔数, 版本, 字节序标记, 状态数, 边数, 输出数, 词库指纹 (32 字节)
+    edge_offsets[状态数 + 1], edge_chars[边数], edge_targets[边数]   每个状态的出边，按字符码位排序
+    fails[状态数]
+    output_offsets[状态数 + 1], output_lengths[输出数], output_ids[输出数]
+"""
+
+import os
+import mmap
+import struct
+from array import array
+from bisect import bisect_left
+
+from DFA import DFA
+from atomic import atomic_write
+from matcher_cache import fingerprint, get_matcher
+from prefilter import Prefilter
+from spans import mask_spans, select_spans
+
+MAGIC = b'SWFM'
+FORMAT_VERSION = 1
+BYTE_ORDER_MARK = 0x01020304
+# 按词库指纹缓存扁平自动机文件的目录（绝对路径，各工作进程共用同一份文件），
+# 可以用环境变量 FLAT_DFA_DIR 指定；artifacts.py 生成的文件不放在这里，不受清理影响
+FLAT_DIR = os.environ.get('FLAT_DFA_DIR') or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'artifacts', 'flat')
+# 缓存目录中最多保留的文件数，超过时删除最久未使用的文件
+MAX_FLAT_FILES = 16
+_HEADER = struct.Struct('=4sIIIII32s')
+
+
+def flat_path(words, folder=None):
+    return os.path.join(folder or FLAT_DIR, f"flat_dfa_{fingerprint(list(words))}.swfm")
+
+
+def cleanup_flat_files(folder, keep=MAX_FLAT_FILES, exclude=()):
+    """
+    按最后使用时间（修改时间）删除多余的扁平自动机文件，返回删除的文件数
+    已映射该文件的进程不受影响（Linux 上映射在关闭前一直有效），之后需要时重新编译
+    """
+    exclude = {os.path.abspath(path) for path in exclude}
+    try:
+        names = [name for name in os.listdir(folder) if name.startswith('flat_dfa_') and name.endswith('.swfm')]
+    except OSError:
+        return 0
+    files = []
+    for name in names:
+        path = os.path.abspath(os.path.join(folder, name))
+        try:
+            files.append((os.stat(path).st_mtime, path))
+        except OSError:
+            continue
+    files.sort(reverse=True)
+    removed = 0
+    for _, path in files[keep:]:
+        if path in exclude:
+            continue
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError:
+            # 例如 Windows 上文件仍被映射
+            pass
+    return removed
+
+
+def write_flat(words, path):
+    """编译词库并写入扁平格式文件"""
+    words = list(words)
+    dfa = DFA(words)
+    num_states = len(dfa.fails) + 1
+
+    children = [[] for _ in range(num_states)]
+    for (state, char), next_state in dfa.transitions.items():
+        children[state].append((ord(char), next_state))
+    edge_offsets = array('I', [0])
+    edge_chars = array('I')
+    edge_targets = array('I')
+    for edges in children:
+        edges.sort()
+        edge_chars.extend(code for code, _ in edges)
+        edge_targets.extend(target for _, target in edges)
+        edge_offsets.append(len(edge_chars))
+
+    fails = array('I', [0]) * num_states
+    for state, fail_state in dfa.fails.items():
+        fails[state] = fail_state
+
+    output_offsets = array('I', [0])
+    output_lengths = array('I')
+    output_ids = array('I')
+    for state in range(num_states):
+        for length, word_id in dfa.outputs.get(state, ()):
+            output_lengths.append(length)
+            output_ids.append(word_id)
+        output_offsets.append(len(output_lengths))
+
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, BYTE_ORDER_MARK, num_states, len(edge_chars),
+                          len(output_lengths), fingerprint(words).encode('ascii'))
+    # 原子替换，多个工作进程同时编译也不会读到写了一半的文件
+    with atomic_write(path) as f:
+        f.write(header)
+        for data in (edge_offsets, edge_chars, edge_targets, fails,
+                     output_offsets, output_lengths, output_ids):
+            data.tofile(f)
+
+
+class FlatAutomaton:
+    def __init__(self, words, path=None):
+        self.words = words
+        # 未指定路径时使用缓存目录，缓存目录中的文件由这里负责清理；
+        # 指定的路径（例如 artifacts.py 生成的文件）由调用方管理
+        cached = path is None
+        # 保存绝对路径，序列化后在其他工作目录中也能找到文件
+        self.path = os.path.abspath(path or flat_path(words))
+        expected = fingerprint(list(words))
+        if self._stored_fingerprint() != expected:
+            write_flat(words, self.path)
+            if cached:
+                cleanup_flat_files(os.path.dirname(self.path), exclude=(self.path,))
+        else:
+            # 更新修改时间，清理时按最近使用保留
+            os.utime(self.path)
+        self.open()
+        if self.fingerprint != expected:
+            raise ValueError(f"扁平自动机文件与词库不一致: {self.path}")
+
+    def _stored_fingerprint(self):
+        # 文件不存在、版本或字节序不符时返回 None，触发重新编译
+        try:
+            with open(self.path, 'rb') as f:
+                header = f.read(_HEADER.size)
+            magic, version, byte_order, *_, stored = _HEADER.unpack(header)
+        except (OSError, struct.error):
+            return None
+        if magic != MAGIC or version != FORMAT_VERSION or byte_order != BYTE_ORDER_MARK:
+            return None
+        return stored.decode('ascii')
+
+    def open(self):
+        with open(self.path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        _, _, _, num_states, num_edges, num_outputs, stored = _HEADER.unpack_from(self._mmap)
+        self.fingerprint = stored.decode('ascii')
+        self.num_states = num_states
+        self._view = memoryview(self._mmap)[_HEADER.size:].cast('I')
+
+        sizes = (num_states + 1, num_edges, num_edges, num_states,
+                 num_states + 1, num_outputs, num_outputs)
+        position = 0
+        arrays = []
+        for size in sizes:
+            arrays.append(self._view[position:position + size])
+            position += size
+        (self.edge_offsets, self.edge_chars, self.edge_targets, self.fails,
+         self.output_offsets, self.output_lengths, self.output_ids) = arrays
+        # 根状态的出边就是所有词的首字符
+        self.prefilter = Prefilter([chr(code) for code in
+                                    self.edge_chars[self.edge_offsets[0]:self.edge_offsets[1]]])
+
+    def close(self):
+        if getattr(self, '_mmap', None) is None:
+            return
+        for name in ('edge_offsets', 'edge_chars', 'edge_targets', 'fails',
+                     'output_offsets', 'output_lengths', 'output_ids', '_view'):
+            view = getattr(self, name, None)
+            if view is not None:
+                view.release()
+        self._mmap.close()
+        self._mmap = None
+
+    def __del__(self):
+        # 从匹配器缓存中淘汰且没有请求再使用时解除映射
+        self.close()
+
+    @classmethod
+    def from_file(cls, path, expected_fingerprint=None):
+        """直接映射已有的文件，不需要词库"""
+        automaton = cls.__new__(cls)
+        automaton.words = None
+        automaton.path = os.path.abspath(path)
+        automaton.open()
+        if expected_fingerprint is not None and automaton.fingerprint != expected_fingerprint:
+            automaton.close()
+            raise ValueError(f"扁平自动机文件与词库不一致: {path}")
+        return automaton
+
+    def __reduce__(self):
+        # 传给子进程时只传文件路径和指纹，子进程重新映射同一个文件
+        return (FlatAutomaton.from_file, (self.path, self.fingerprint))
+
+    def find_spans(self, text):
+        """返回所有命中记录 (start, end, word_id)，允许重叠"""
+        if not self.prefilter.may_match(text):
+            return []
+        edge_offsets = self.edge_offsets
+        edge_chars = self.edge_chars
+        edge_targets = self.edge_targets
+        fails = self.fails
+        output_offsets = self.output_offsets
+        output_lengths = self.output_lengths
+        output_ids = self.output_ids
+        result = []
+        state = 0
+        for i, char in enumerate(text):
+            code = ord(char)
+            while True:
+                low = edge_offsets[state]
+                high = edge_offsets[state + 1]
+                index = bisect_left(edge_chars, code, low, high)
+                if index < high and edge_chars[index] == code:
+                    state = edge_targets[index]
+                    break
+                if state == 0:
+                    break
+                state = fails[state]
+            first = output_offsets[state]
+            last = output_offsets[state + 1]
+            for index in range(first, last):
+                length = output_lengths[index]
+                result.append((i - length + 1, i, output_ids[index]))
+        return result
+
+
+def find_spans(text, words, policy='all'):
+    automaton = get_matcher('flat_dfa', words, FlatAutomaton)
+    return select_spans(automaton.find_spans(text), policy)
+
+
+def flat_dfa_filter_words(text, words):
+    automaton = get_matcher('flat_dfa', words, FlatAutomaton)
+    return mask_spans(text, automaton.find_spans(text))
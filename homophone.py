@@ -0,0 +1,85 @@
+"""
+拼音同音匹配
+Whisper 经常把敏感词识别成同音字（例如"小狼"识别成"小浪"），按字符匹配的引擎都无法命中。
+这里把词库和文本都转换为不带声调的拼音音节序列，用同一个 DFA 在音节序列上匹配：
+每个汉字对应一个音节，非汉字字符对应一个加前缀的记号（不会与音节混淆，字母不区分大小写），
+音节序号就是字符位置，命中区间直接对应原文（简体文本）中的字符区间。
+词库规模增大时只增加自动机的状态数，不需要枚举每个词的所有同音写法
+"""
+
+from functools import lru_cache
+
+from pypinyin import Style, lazy_pinyin
+
+from DFA import DFA
+from matcher_cache import get_matcher
+from spans import mask_spans, select_spans
+
+# 非汉字字符的记号前缀
+NON_HAN_PREFIX = '#'
+# 缓存最近转换过的分段，同一分段的过滤和计数只转换一次
+SYLLABLE_CACHE_SIZE = 1024
+# 只缓存不超过该长度的文本（Whisper 分段一般只有几十个字），整段长文本直接转换，不占用缓存
+MAX_CACHED_TEXT_LENGTH = 512
+
+
+def _non_han(chars):
+    # 字母不区分大小写
+    return [NON_HAN_PREFIX + char.casefold() for char in chars]
+
+
+def convert(text):
+    """文本 -> 音节元组，与文本的字符一一对应（多音字按上下文取读音）"""
+    syllables = lazy_pinyin(text, style=Style.NORMAL, errors=_non_han)
+    if len(syllables) != len(text):
+        # 个别字符的转换结果不是一个音节时逐字转换，保证位置对应
+        syllables = [''.join(lazy_pinyin(char, style=Style.NORMAL, errors=_non_han)) or NON_HAN_PREFIX + char
+                     for char in text]
+    return tuple(syllables)
+
+
+# 分段文本的转换结果按内容缓存；词库的转换只在编译时进行一次，不占用这个缓存
+_cached_convert = lru_cache(maxsize=SYLLABLE_CACHE_SIZE)(convert)
+
+
+def to_syllables(text):
+    if len(text) > MAX_CACHED_TEXT_LENGTH:
+        return convert(text)
+    return _cached_convert(text)
+
+
+class SyllableDFA(DFA):
+    """音节序列上的 DFA，只使用 scan；不构建首字符正则预过滤（多字母音节无法放进字符类）"""
+
+    def __init__(self, words):
+        self.words = words
+        self.prefilter = None
+        self.build()
+
+
+class PinyinMatcher:
+    def __init__(self, words):
+        self.words = words
+        # 词按整体转换，多音字按词内的上下文取读音
+        self.syllable_words = [convert(word) if word else () for word in words]
+        self.dfa = SyllableDFA(self.syllable_words)
+        self.first_syllables = frozenset(word[0] for word in self.syllable_words if word)
+
+    def find_spans(self, text):
+        """返回所有同音命中记录 (start, end, word_id)，允许重叠"""
+        if not self.first_syllables or not text:
+            return []
+        syllables = to_syllables(text)
+        if self.first_syllables.isdisjoint(syllables):
+            return []
+        return self.dfa.scan(syllables)[0]
+
+
+def find_spans(text, words, policy='all'):
+    matcher = get_matcher('pinyin', words, PinyinMatcher)
+    return select_spans(matcher.find_spans(text), policy)
+
+
+def pinyin_filter_words(text, words):
+    matcher = get_matcher('pinyin', words, PinyinMatcher)
+    return mask_spans(text, matcher.find_spans(text))
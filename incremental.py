@@ -0,0 +1,161 @@
+"""
+支持增量增删词的匹配器
+在编译好的基础自动机之上叠加一个只包含新增词的小自动机（增量层），删除的词记为墓碑，
+查询时合并两层的结果并过滤墓碑。增删一个词只需重建增量层（与增量词数成正比），
+增量层或墓碑超过阈值时在后台线程中用全部有效词重建基础自动机（压缩），完成后原子切换。
+命中记录的 word_id 是词在 self.words 中的全局序号，增删不会改变已有词的序号
+"""
+
+import threading
+
+import engines
+
+# 支持作为基础/增量层的引擎
+INCREMENTAL_ENGINES = ('DFA', 'aho_corasick')
+# 增量层的词数超过该值时压缩
+MAX_DELTA_WORDS = 1024
+# 墓碑数超过基础层词数的该比例时压缩
+MAX_TOMBSTONE_RATIO = 0.1
+
+
+class _Layer:
+    """一层编译好的匹配器，global_ids[局部序号] = 全局序号"""
+
+    def __init__(self, engine, entries):
+        self.global_ids = [word_id for word_id, _ in entries]
+        words = [word for _, word in entries]
+        module = engines.load_engine(engine)
+        self.matcher = getattr(module, engines.ENGINES[engine][1])(words) if words else None
+
+    def find_spans(self, text):
+        if self.matcher is None:
+            return []
+        global_ids = self.global_ids
+        return [(start, end, global_ids[word_id]) for start, end, word_id in self.matcher.find_spans(text)]
+
+
+class IncrementalMatcher:
+    def __init__(self, words, engine='DFA', max_delta_words=MAX_DELTA_WORDS,
+                 max_tombstone_ratio=MAX_TOMBSTONE_RATIO, background=True):
+        if engine not in INCREMENTAL_ENGINES:
+            raise ValueError(f"增量匹配只支持: {', '.join(INCREMENTAL_ENGINES)}")
+        self.engine = engine
+        self.max_delta_words = max_delta_words
+        self.max_tombstone_ratio = max_tombstone_ratio
+        self.background = background
+        self.words = []  # 全局序号 -> 词，删除的词保留原位
+        self._ids = {}  # 有效词 -> 全局序号
+        for word in words:
+            if word and word not in self._ids:
+                self._ids[word] = len(self.words)
+                self.words.append(word)
+        self._lock = threading.Lock()
+        self._compacting = False
+        self.compactions = 0
+        base = _Layer(engine, list(self._entries()))
+        # (基础层, 增量层, 增量层的词, 墓碑) 整体替换，查询不需要加锁
+        self._state = (base, _Layer(engine, []), (), frozenset())
+
+    def _entries(self):
+        return ((word_id, self.words[word_id]) for word_id in sorted(self._ids.values()))
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, word):
+        return word in self._ids
+
+    def add(self, word):
+        """添加一个词，返回是否有变化"""
+        with self._lock:
+            if not word or word in self._ids:
+                return False
+            base, _, delta_entries, tombstones = self._state
+            word_id = len(self.words)
+            self.words.append(word)
+            self._ids[word] = word_id
+            delta_entries = delta_entries + ((word_id, word),)
+            self._state = (base, _Layer(self.engine, delta_entries), delta_entries, tombstones)
+            compact = self._needs_compaction()
+        if compact:
+            self._start_compaction()
+        return True
+
+    def remove(self, word):
+        """删除一个词，返回是否有变化"""
+        with self._lock:
+            word_id = self._ids.pop(word, None)
+            if word_id is None:
+                return False
+            base, delta, delta_entries, tombstones = self._state
+            if any(entry_id == word_id for entry_id, _ in delta_entries):
+                delta_entries = tuple(entry for entry in delta_entries if entry[0] != word_id)
+                delta = _Layer(self.engine, delta_entries)
+            else:
+                tombstones = tombstones | {word_id}
+            self._state = (base, delta, delta_entries, tombstones)
+            compact = self._needs_compaction()
+        if compact:
+            self._start_compaction()
+        return True
+
+    def _needs_compaction(self):
+        # 在锁内调用，需要压缩时标记为压缩中，避免重复启动
+        base, _, delta_entries, tombstones = self._state
+        if self._compacting:
+            return False
+        if (len(delta_entries) > self.max_delta_words
+                or len(tombstones) > self.max_tombstone_ratio * max(len(base.global_ids), 1)):
+            self._compacting = True
+            return True
+        return False
+
+    def _start_compaction(self):
+        if self.background:
+            threading.Thread(target=self.compact, daemon=True).start()
+        else:
+            self.compact()
+
+    def compact(self):
+        """用当前全部有效词重建基础层，重建期间的增删在切换时重新应用"""
+        with self._lock:
+            self._compacting = True
+            entries = list(self._entries())
+        try:
+            base = _Layer(self.engine, entries)
+        except BaseException:
+            with self._lock:
+                self._compacting = False
+            raise
+        with self._lock:
+            # 重建期间新增的词放回增量层，删除的词重新记为墓碑
+            base_ids = set(base.global_ids)
+            live_ids = set(self._ids.values())
+            delta_entries = tuple((word_id, self.words[word_id]) for word_id in sorted(live_ids - base_ids))
+            tombstones = frozenset(base_ids - live_ids)
+            self._state = (base, _Layer(self.engine, delta_entries), delta_entries, tombstones)
+            self._compacting = False
+            self.compactions += 1
+
+    def find_spans(self, text):
+        """返回所有命中记录 (start, end, word_id)，允许重叠"""
+        base, delta, _, tombstones = self._state
+        spans = base.find_spans(text)
+        if tombstones:
+            spans = [span for span in spans if span[2] not in tombstones]
+        delta_spans = delta.find_spans(text)
+        if delta_spans:
+            spans.extend(delta_spans)
+        return spans
+
+    def stats(self):
+        base, _, delta_entries, tombstones = self._state
+        return {
+            'engine': self.engine,
+            'words': len(self._ids),
+            'base_words': len(base.global_ids),
+            'delta_words': len(delta_entries),
+            'tombstones': len(tombstones),
+            'compacting': self._compacting,
+            'compactions': self.compactions
+        }
@@ -0,0 +1,135 @@
+"""
+后台任务队列
+/api/process 提交任务后立即返回任务 ID，由有界的工作线程池执行转录与过滤，
+/api/jobs/<id> 查询任务状态、进度和结果；流式任务在运行中追加事件，流式接口跟随任务推送
+"""
+
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueueFullError(Exception):
+    """等待中的任务过多"""
+
+
+class Job:
+    def __init__(self, job_id, description=''):
+        self.id = job_id
+        self.description = description
+        self.status = 'queued'  # queued / running / done / failed
+        self.progress = 0
+        self.message = '排队中'
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.events = []  # 流式任务产出的事件
+        self._changed = threading.Condition()
+
+    def update(self, progress=None, message=None):
+        """由任务函数调用，报告当前进度 (0-100) 和阶段说明"""
+        if progress is not None:
+            self.progress = progress
+        if message is not None:
+            self.message = message
+
+    def emit(self, event):
+        """由任务函数调用，追加一个事件并唤醒跟随的请求"""
+        with self._changed:
+            self.events.append(event)
+            self._changed.notify_all()
+
+    def follow(self):
+        """依次产出任务的全部事件（包括已经产出的），任务结束后返回"""
+        index = 0
+        while True:
+            with self._changed:
+                while index == len(self.events) and self.finished_at is None:
+                    self._changed.wait()
+                events = self.events[index:]
+                finished = self.finished_at is not None
+            index += len(events)
+            yield from events
+            if finished:
+                return
+
+    def finish(self):
+        with self._changed:
+            self.finished_at = time.time()
+            self._changed.notify_all()
+
+    def to_dict(self):
+        data = {
+            'job_id': self.id,
+            'description': self.description,
+            'status': self.status,
+            'progress': self.progress,
+            'message': self.message,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+        if self.status == 'done':
+            data['result'] = self.result
+        elif self.status == 'failed':
+            data['error'] = self.error
+        return data
+
+
+class JobManager:
+    def __init__(self, max_workers=2, max_pending=16, keep_seconds=3600):
+        self.max_pending = max_pending
+        self.keep_seconds = keep_seconds
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix='job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args, description=''):
+        """提交任务，func(job, *args) 的返回值作为任务结果；队列已满时抛出 QueueFullError"""
+        with self._lock:
+            self._cleanup()
+            active = sum(1 for job in self._jobs.values() if job.status in ('queued', 'running'))
+            if active >= self.max_pending:
+                raise QueueFullError(f"当前有 {active} 个任务在处理，请稍后再试")
+            job = Job(uuid.uuid4().hex, description)
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, func, args)
+        return job
+
+    def _run(self, job, func, args):
+        job.status = 'running'
+        job.started_at = time.time()
+        try:
+            job.result = func(job, *args)
+            job.progress = 100
+            job.message = '处理完成'
+            job.status = 'done'
+        except Exception as e:
+            print(f"任务 {job.id} 失败: {e}")
+            job.error = str(e)
+            job.message = '处理失败'
+            job.status = 'failed'
+        finally:
+            job.finish()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _cleanup(self):
+        # 清理已结束且超过保留时间的任务
+        now = time.time()
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at is not None and now - job.finished_at > self.keep_seconds]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return counts
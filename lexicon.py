@@ -0,0 +1,234 @@
+"""
+服务端词库管理
+词库文件（每行一个词）修改后或通过管理接口提交新词库时，在后台线程中编译各引擎的匹配器，
+编译完成后原子地切换到新版本（版本号递增）。请求开始时取得当前版本并一直使用到结束，
+切换不影响处理中的请求；旧版本的匹配器在最后一个使用它的请求结束后才解除固定。
+指定 artifact_dir 时匹配器通过 artifacts.py 保存到磁盘，启动和重新加载时词库未变就直接读取文件
+"""
+
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+import artifacts
+import engines
+from atomic import atomic_write
+from matcher_cache import FrozenWords, fingerprint, matcher_cache
+
+# 检查词库文件是否修改的间隔（秒）
+POLL_INTERVAL = 2.0
+
+
+def read_lexicon(path):
+    """读取词库文件，每行一个词，忽略空行和重复的词"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return list(dict.fromkeys(line.strip() for line in f if line.strip()))
+
+
+def write_lexicon(path, words):
+    # 原子替换，文件监视线程不会读到写了一半的文件
+    with atomic_write(path, 'w', encoding='utf-8') as f:
+        f.write(''.join(f"{word}\n" for word in words))
+
+
+class LexiconVersion:
+    def __init__(self, version, words, matchers, source, compile_seconds, errors=None):
+        self.version = version
+        # 不可变词库，指纹只计算一次，请求按它查询匹配器时直接命中
+        self.words = words if isinstance(words, FrozenWords) else FrozenWords(words)
+        self.fingerprint = self.words.fingerprint
+        self.matchers = matchers  # 引擎名称 -> 编译好的匹配器
+        self.errors = errors or {}  # 编译失败的引擎名称 -> 错误信息，这些引擎在请求时按需编译
+        self.source = source
+        self.compile_seconds = compile_seconds
+        self.created_at = time.time()
+        self.active = 0  # 正在使用该版本的请求数
+        self.retired = False
+
+    def to_dict(self):
+        return {
+            'version': self.version,
+            'word_count': len(self.words),
+            'fingerprint': self.fingerprint,
+            'engines': list(self.matchers),
+            'failed_engines': self.errors,
+            'source': self.source,
+            'compile_seconds': round(self.compile_seconds, 3),
+            'created_at': self.created_at,
+            'active_requests': self.active
+        }
+
+
+class LexiconStore:
+    def __init__(self, path, engine_names=('DFA',), poll_interval=POLL_INTERVAL, artifact_dir=None):
+        self.path = path
+        self.engine_names = list(engine_names)
+        self.poll_interval = poll_interval
+        self.artifact_dir = artifact_dir
+        self._lock = threading.Lock()
+        self._current = LexiconVersion(0, [], {}, 'empty', 0.0)
+        self._pending = None  # 等待编译的 (词库, 来源)，只保留最新一次
+        self._compiling = False
+        self._file_state = None
+        self._watcher = None
+        self.last_error = None
+        # 启动时同步加载词库文件，之后的更新都在后台编译；
+        # 加载失败时以空词库启动，不影响服务启动
+        if os.path.exists(path):
+            self._file_state = self._stat()
+            try:
+                words = read_lexicon(path)
+                self._install(words, *self._compile(words), source='file')
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"加载词库文件失败，以空词库启动: {e}")
+
+    @property
+    def current(self):
+        return self._current
+
+    def acquire(self):
+        """取得当前版本并登记为使用中，用完后必须调用 release"""
+        with self._lock:
+            version = self._current
+            version.active += 1
+            return version
+
+    def release(self, version):
+        with self._lock:
+            version.active -= 1
+            unpin = version.retired and version.active == 0
+        if unpin:
+            self._unpin(version)
+
+    @contextmanager
+    def use(self):
+        version = self.acquire()
+        try:
+            yield version
+        finally:
+            self.release(version)
+
+    def update(self, words, source='api'):
+        """提交新词库，立即返回；在后台编译完成后切换版本"""
+        words = list(dict.fromkeys(word.strip() for word in words if word.strip()))
+        with self._lock:
+            self._pending = (words, source)
+            if self._compiling:
+                return
+            self._compiling = True
+        threading.Thread(target=self._compile_pending, daemon=True).start()
+
+    def save(self, words):
+        """写入词库文件并提交编译（文件监视线程发现指纹相同时不会重复编译）"""
+        write_lexicon(self.path, words)
+        with self._lock:
+            self._file_state = self._stat()
+        self.update(words, 'api')
+
+    def reload(self):
+        """重新读取词库文件"""
+        with self._lock:
+            self._file_state = self._stat()
+        self.update(read_lexicon(self.path), 'file')
+
+    def _compile_pending(self):
+        while True:
+            with self._lock:
+                if self._pending is None:
+                    self._compiling = False
+                    return
+                words, source = self._pending
+                self._pending = None
+            if fingerprint(words) == self._current.fingerprint:
+                continue
+            matchers, errors, compile_seconds = self._compile(words)
+            if errors and not matchers:
+                self.last_error = '; '.join(f"{engine}: {error}" for engine, error in errors.items())
+                print(f"词库编译失败，继续使用版本 {self._current.version}: {self.last_error}")
+                continue
+            self._install(words, matchers, errors, compile_seconds, source)
+
+    def _compile(self, words):
+        """逐个引擎编译，某个引擎失败（例如词库超出稠密转移表的内存上限）时跳过它，不影响其他引擎"""
+        start = time.time()
+        matchers = {}
+        errors = {}
+        for engine in self.engine_names:
+            try:
+                matchers[engine] = self._build(engine, words)
+            except Exception as e:
+                errors[engine] = str(e)
+                print(f"引擎 {engine} 编译词库失败，已跳过: {e}")
+        return matchers, errors, time.time() - start
+
+    def _build(self, engine, words):
+        if self.artifact_dir is None:
+            module = engines.load_engine(engine)
+            return getattr(module, engines.ENGINES[engine][1])(words)
+        # 每个引擎一个文件，词库指纹不一致时重新编译并覆盖
+        path = os.path.join(self.artifact_dir, f"{engine}{artifacts.ARTIFACT_SUFFIX}")
+        matcher = artifacts.load_or_compile(engine, words, path)
+        if engine == 'flat_dfa':
+            # 每次词库更新都会生成新的 .swfm 文件，只保留最近使用的几个
+            engines.load_engine(engine).cleanup_flat_files(self.artifact_dir, exclude=(matcher.path,))
+        return matcher
+
+    def _install(self, words, matchers, errors, compile_seconds, source):
+        words = FrozenWords(words)
+        # 先固定新版本的匹配器，各模块的过滤函数按 (引擎, 词库指纹) 直接命中
+        for engine, matcher in matchers.items():
+            matcher_cache.pin(engine, words, matcher)
+        with self._lock:
+            old = self._current
+            self._current = LexiconVersion(old.version + 1, words, matchers, source, compile_seconds, errors)
+            old.retired = True
+            unpin = old.active == 0
+            self.last_error = None
+        if unpin:
+            self._unpin(old)
+        print(f"词库已切换到版本 {self._current.version}: {len(words)} 个词,"
+              f" 编译耗时 {compile_seconds:.2f} 秒")
+        if errors:
+            print(f"以下引擎未预编译，请求时按需编译: {', '.join(errors)}")
+
+    def _unpin(self, version):
+        for engine in version.matchers:
+            matcher_cache.unpin(engine, version.words)
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def start_watching(self):
+        """启动后台线程，定期检查词库文件的修改时间和大小"""
+        if self._watcher is None:
+            self._watcher = threading.Thread(target=self._watch, daemon=True)
+            self._watcher.start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_interval)
+            state = self._stat()
+            with self._lock:
+                changed = state is not None and state != self._file_state
+                if changed:
+                    self._file_state = state
+            if changed:
+                try:
+                    self.update(read_lexicon(self.path), 'file')
+                except (OSError, UnicodeDecodeError) as e:
+                    print(f"读取词库文件失败: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'path': self.path,
+                'current': self._current.to_dict(),
+                'compiling': self._compiling,
+                'last_error': self.last_error
+            }
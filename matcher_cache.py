@@ -0,0 +1,135 @@
+"""
+敏感词匹配器编译缓存
+按 (过滤引擎, 词库指纹) 缓存编译好的自动机/字典树/正则，进程内共享，
+采用 LRU 淘汰并按估算内存设置上限，重复词库只需一次字典查找；
+固定 (pin) 的匹配器不参与淘汰，直到全部解除固定。
+长期使用的词库（例如服务端词库的各版本）用 FrozenWords 保存，指纹只在创建时计算一次
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+# 编译结构中每个词库字符的估算开销（字节），用于内存上限统计
+BYTES_PER_CHAR = 200
+
+
+def fingerprint(words):
+    """计算词库指纹（与词的顺序相关）"""
+    data = '\x00'.join(words).encode('utf-8', 'surrogatepass')
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class FrozenWords(tuple):
+    """不可变的词库，创建时计算一次指纹，按它查询匹配器时不再对整个词库求哈希"""
+
+    def __new__(cls, words):
+        self = super().__new__(cls, words)
+        self.fingerprint = fingerprint(self)
+        return self
+
+
+def _fingerprint_of(words):
+    return words.fingerprint if isinstance(words, FrozenWords) else fingerprint(words)
+
+
+def estimate_size(words):
+    """估算编译后匹配器占用的内存（字节）"""
+    return (sum(len(word) for word in words) + len(words)) * BYTES_PER_CHAR
+
+
+class MatcherCache:
+    def __init__(self, max_entries=32, max_bytes=256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        # (引擎, 指纹) -> [匹配器, 固定次数]
+        self._pinned = {}
+        self._lock = threading.Lock()
+
+    def get(self, engine, words, builder, words_fingerprint=None):
+        """
+        获取编译好的匹配器，未命中时调用 builder(words) 编译并缓存
+        FrozenWords 直接使用其中保存的指纹；其他调用方已有指纹时可以通过 words_fingerprint 传入
+        """
+        if not isinstance(words, tuple):
+            # 复制可变的词库，调用方之后原地修改也不影响缓存的匹配器
+            words = list(words)
+        key = (engine, words_fingerprint or _fingerprint_of(words))
+        with self._lock:
+            pinned = self._pinned.get(key)
+            if pinned is not None:
+                self.hits += 1
+                return pinned[0]
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        # 在锁外编译，避免大词库阻塞其他引擎的查询
+        matcher = builder(words)
+        size = estimate_size(words)
+        if size > self.max_bytes:
+            return matcher
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                # 其他线程已经编译完成，沿用已缓存的结果
+                self._entries.move_to_end(key)
+                return entry[0]
+            self._entries[key] = (matcher, size)
+            self.current_bytes += size
+            self._evict()
+        return matcher
+
+    def pin(self, engine, words, matcher):
+        """固定一个已编译的匹配器，之后的 get 直接返回它，不受 LRU 和内存上限影响"""
+        key = (engine, _fingerprint_of(words))
+        with self._lock:
+            pinned = self._pinned.setdefault(key, [matcher, 0])
+            pinned[1] += 1
+
+    def unpin(self, engine, words):
+        key = (engine, _fingerprint_of(words))
+        with self._lock:
+            pinned = self._pinned.get(key)
+            if pinned is None:
+                return
+            pinned[1] -= 1
+            if pinned[1] <= 0:
+                del self._pinned[key]
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries
+                                 or self.current_bytes > self.max_bytes):
+            _, (_, size) = self._entries.popitem(last=False)
+            self.current_bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'pinned': len(self._pinned),
+                'estimated_bytes': self.current_bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+# 进程级共享缓存
+matcher_cache = MatcherCache()
+
+
+def get_matcher(engine, words, builder, words_fingerprint=None):
+    return matcher_cache.get(engine, words, builder, words_fingerprint)
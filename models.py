@@ -0,0 +1,110 @@
+"""
+Whisper 模型管理
+按模型大小缓存已加载的模型，在所有请求之间共用；常驻模型数有上限，超出时卸载最久未使用的模型。
+同一个模型实例同一时间只给一个任务使用（Whisper 解码时会在模型上挂 kv-cache 钩子，并发调用会互相干扰）
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+DEFAULT_MODEL = 'base'
+
+
+class ModelEntry:
+    def __init__(self, name, model, load_seconds):
+        self.name = name
+        self.model = model
+        self.load_seconds = load_seconds
+        self.resident_bytes = model_bytes(model)
+        self.loaded_at = time.time()
+        self.last_used = self.loaded_at
+        self.uses = 0
+        self.lock = threading.Lock()
+
+    def to_dict(self):
+        return {
+            'load_seconds': round(self.load_seconds, 3),
+            'resident_mb': round(self.resident_bytes / 1024 / 1024, 1),
+            'loaded_at': self.loaded_at,
+            'last_used': self.last_used,
+            'uses': self.uses,
+            'busy': self.lock.locked()
+        }
+
+
+def model_bytes(model):
+    """估算模型参数和缓冲区占用的内存（torch 模块），无法估算时返回 0"""
+    total = 0
+    for tensors in ('parameters', 'buffers'):
+        for tensor in getattr(model, tensors, lambda: ())():
+            total += tensor.numel() * tensor.element_size()
+    return total
+
+
+class ModelManager:
+    def __init__(self, loader, max_resident=2):
+        self.loader = loader  # loader(name) -> model，例如 whisper.load_model
+        self.max_resident = max_resident
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # 每个模型一个加载锁，避免同一模型被并发加载多次
+        self._load_locks = {}
+
+    def _entry(self, name):
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None:
+                self._entries.move_to_end(name)
+                return entry
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(name)
+            if entry is not None:
+                return entry
+            print(f"加载 Whisper {name} 模型...")
+            start = time.time()
+            model = self.loader(name)
+            entry = ModelEntry(name, model, time.time() - start)
+            print(f"Whisper {name} 模型加载完成，耗时: {entry.load_seconds:.2f} 秒")
+            with self._lock:
+                self._entries[name] = entry
+                self._evict(keep=name)
+            return entry
+
+    def _evict(self, keep=None):
+        # 卸载最久未使用且空闲的模型，正在使用的模型保留到下次加载时再检查；
+        # 刚加载的模型 (keep) 还没被使用，不能当作空闲模型卸载
+        for name in list(self._entries):
+            if len(self._entries) <= self.max_resident:
+                break
+            if name != keep and not self._entries[name].lock.locked():
+                del self._entries[name]
+                print(f"已卸载 Whisper {name} 模型")
+
+    def get(self, name=DEFAULT_MODEL):
+        """返回已加载的模型，没有时加载"""
+        return self._entry(name).model
+
+    @contextmanager
+    def use(self, name=DEFAULT_MODEL):
+        """独占使用一个模型: with manager.use('base') as model: ..."""
+        entry = self._entry(name)
+        with entry.lock:
+            entry.uses += 1
+            entry.last_used = time.time()
+            yield entry.model
+
+    def loaded(self):
+        with self._lock:
+            return list(self._entries)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'max_resident': self.max_resident,
+                'models': {name: entry.to_dict() for name, entry in self._entries.items()}
+            }
@@ -0,0 +1,138 @@
+"""
+抗干扰匹配
+把空白、标点、零宽字符等可忽略字符当作透明字符：扫描时不送入自动机，
+"小 狼"、"小,狼"、"开-心" 也能命中"小狼"、"开心"。命中区间仍是原文中的位置，
+包含词内部被跳过的字符。一次扫描完成，不生成去掉干扰字符的文本副本
+"""
+
+import re
+import string
+from collections import deque
+
+from DFA import DFA
+from matcher_cache import get_matcher
+from spans import mask_spans, select_spans
+
+# 注意：文件名有空格，由 engines 负责加载
+import engines
+DoubleArrayTrie = engines.load_engine('trie_tree').DoubleArrayTrie
+
+# 默认的可忽略字符: 空白、零宽字符、ASCII 标点和常见中文标点
+IGNORABLE_CHARS = (
+    ' \t\r\n\v\f\xa0\u3000'
+    '\u200b\u200c\u200d\u2060\ufeff'
+    + string.punctuation +
+    '，。、；：？！…—–·～￥「」『』（）《》〈〉【】“”‘’'
+)
+
+
+def strip_ignorable(word, ignorable):
+    return ''.join(char for char in word if char not in ignorable)
+
+
+class NoiseTolerantDFA(DFA):
+    # 词内可以夹杂任意多个干扰字符，命中区间的长度不受限（不支持分块并行扫描）
+    max_span = None
+
+    def __init__(self, words, ignorable=IGNORABLE_CHARS):
+        self.ignorable = frozenset(ignorable)
+        self.ignorable_pattern = re.compile(f"[{''.join(re.escape(char) for char in sorted(self.ignorable))}]")
+        # 词中本身的可忽略字符也去掉，否则扫描时跳过它们后永远无法命中
+        stripped = [strip_ignorable(word, self.ignorable) for word in words]
+        self.max_length = max((len(word) for word in stripped), default=0)
+        super().__init__(stripped)
+        self.words = words
+
+    def find_spans(self, text):
+        """返回所有命中记录 (start, end, word_id)，允许重叠"""
+        if not self.prefilter.may_match(text):
+            return []
+        if self.ignorable_pattern.search(text) is None:
+            # 没有可忽略字符时与普通扫描相同
+            return self.scan(text)[0]
+        return self.scan_ignoring(text)
+
+    def scan_ignoring(self, text):
+        transitions = self.transitions
+        fails = self.fails
+        outputs = self.outputs
+        ignorable = self.ignorable
+        # 最近送入自动机的字符在原文中的位置，词长为 n 的命中起点是倒数第 n 个
+        positions = deque(maxlen=self.max_length)
+        result = []
+        state = 0
+        for i, char in enumerate(text):
+            if char in ignorable:
+                continue
+            positions.append(i)
+            next_state = transitions.get((state, char))
+            while next_state is None and state != 0:
+                state = fails[state]
+                next_state = transitions.get((state, char))
+            state = next_state or 0
+            hits = outputs.get(state)
+            if hits:
+                for length, word_id in hits:
+                    result.append((positions[-length], i, word_id))
+        return result
+
+
+class NoiseTolerantTrie(DoubleArrayTrie):
+    # 词内可以夹杂任意多个干扰字符，命中区间的长度不受限（不支持分块并行扫描）
+    max_span = None
+
+    def __init__(self, words, ignorable=IGNORABLE_CHARS):
+        self.ignorable = frozenset(ignorable)
+        super().__init__([strip_ignorable(word, self.ignorable) for word in words])
+        self.words = words
+
+    def find_spans(self, text):
+        """返回所有命中记录 (start, end, word_id)，允许重叠"""
+        if not self.prefilter.may_match(text):
+            return []
+        base = self.base
+        check = self.check
+        value = self.value
+        size = len(check)
+        codes = self.codes
+        ignorable = self.ignorable
+        # 可忽略字符编码为 -1（跳过），词库中未出现的字符编码为 0（结束匹配）
+        text_codes = [-1 if char in ignorable else codes.get(char, 0) for char in text]
+        result = []
+        for i in range(len(text_codes)):
+            if text_codes[i] <= 0:
+                continue
+            state = 0
+            for j in range(i, len(text_codes)):
+                code = text_codes[j]
+                if code < 0:
+                    continue
+                if not code:
+                    break
+                t = base[state] + code
+                if t >= size or check[t] != state:
+                    break
+                state = t
+                if value[state] >= 0:
+                    result.append((i, j, value[state]))
+        return result
+
+
+def find_spans(text, words, policy='all'):
+    dfa = get_matcher('noise_dfa', words, NoiseTolerantDFA)
+    return select_spans(dfa.find_spans(text), policy)
+
+
+def noise_dfa_filter_words(text, words):
+    dfa = get_matcher('noise_dfa', words, NoiseTolerantDFA)
+    return mask_spans(text, dfa.find_spans(text))
+
+
+def find_trie_spans(text, words, policy='all'):
+    trie = get_matcher('noise_trie', words, NoiseTolerantTrie)
+    return select_spans(trie.find_spans(text), policy)
+
+
+def noise_trie_filter_words(text, words):
+    trie = get_matcher('noise_trie', words, NoiseTolerantTrie)
+    return mask_spans(text, trie.find_spans(text))
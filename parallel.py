@@ -0,0 +1,96 @@
+"""
+长文本多进程分块扫描
+把长文本切成相互重叠 (最长命中长度 - 1) 个字符的块，交给进程池并行扫描；
+编译好的匹配器在每个工作进程启动时只传输一次，结果合并后与串行扫描完全一致
+"""
+
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+import engines
+from spans import mask_spans, select_spans
+
+# 每个块负责的字符数
+CHUNK_SIZE = 256 * 1024
+
+# 工作进程中的匹配器，由 _init_worker 设置
+_worker_matcher = None
+
+
+def _init_worker(engine, payload):
+    global _worker_matcher
+    # 先加载引擎模块，反序列化时才能找到匹配器类
+    engines.load_engine(engine)
+    _worker_matcher = pickle.loads(payload)
+
+
+def _scan_chunk(task):
+    scan_start, own_start, chunk = task
+    result = []
+    for start, end, word_id in _worker_matcher.find_spans(chunk):
+        end += scan_start
+        # 与前一块重叠部分的命中由前一块负责，避免重复
+        if end >= own_start:
+            result.append((start + scan_start, end, word_id))
+    return result
+
+
+def split_chunks(text, overlap, chunk_size=CHUNK_SIZE):
+    """切分文本，返回 (扫描起点, 负责区间起点, 块文本) 列表"""
+    chunks = []
+    for own_start in range(0, len(text), chunk_size):
+        scan_start = max(own_start - overlap, 0)
+        chunks.append((scan_start, own_start, text[scan_start:own_start + chunk_size]))
+    return chunks
+
+
+class ParallelScanner:
+    def __init__(self, engine, words, workers=None, chunk_size=CHUNK_SIZE):
+        self.engine = engine
+        self.words = list(words)
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.matcher = engines.compile_engine(engine, self.words)
+        # 匹配器可以用 max_span 声明命中区间在原文中的最大长度，None 表示不受限（例如抗干扰引擎
+        # 跳过任意多个干扰字符），这类引擎无法按固定重叠切块；默认按最长词长计算
+        max_span = getattr(self.matcher, 'max_span', max((len(word) for word in self.words), default=1))
+        if max_span is None:
+            raise ValueError(f"引擎 {engine} 的命中长度不受限，不支持分块并行扫描")
+        self.overlap = max(max_span - 1, 0)
+        self.executor = ProcessPoolExecutor(
+            self.workers,
+            initializer=_init_worker,
+            initargs=(engine, pickle.dumps(self.matcher, pickle.HIGHEST_PROTOCOL)))
+
+    def find_spans(self, text, policy='all'):
+        """并行扫描，返回与串行 find_spans 相同的命中记录"""
+        if len(text) <= self.chunk_size:
+            return select_spans(self.matcher.find_spans(text), policy)
+        result = []
+        for spans in self.executor.map(_scan_chunk, split_chunks(text, self.overlap, self.chunk_size)):
+            result.extend(spans)
+        return select_spans(result, policy)
+
+    def filter(self, text):
+        spans = self.find_spans(text, engines.default_policy(self.engine))
+        return mask_spans(text, spans)
+
+    def close(self):
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def find_spans_parallel(engine, text, words, policy='all', workers=None, chunk_size=CHUNK_SIZE):
+    with ParallelScanner(engine, words, workers, chunk_size) as scanner:
+        return scanner.find_spans(text, policy)
+
+
+def filter_parallel(engine, text, words, workers=None, chunk_size=CHUNK_SIZE):
+    with ParallelScanner(engine, words, workers, chunk_size) as scanner:
+        return scanner.filter(text)
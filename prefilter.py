@@ -0,0 +1,25 @@
+"""
+词库首字符预过滤
+大多数 Whisper 分段不含敏感词；文本中没有出现任何词的首字符时一定没有命中，
+各匹配器先做这一判断，干净的分段直接跳过整段扫描
+"""
+
+import re
+
+
+def first_chars(words):
+    """词库中所有词的首字符集合"""
+    return frozenset(word[0] for word in words if word)
+
+
+class Prefilter:
+    def __init__(self, words):
+        self.chars = first_chars(words)
+        # 用字符类正则在 C 层查找，比 frozenset.isdisjoint 快：后者要为每个非 Latin-1 字符创建字符串对象
+        self.pattern = None
+        if self.chars:
+            self.pattern = re.compile(f"[{''.join(re.escape(char) for char in sorted(self.chars))}]")
+
+    def may_match(self, text):
+        """文本中出现了某个词的首字符时才可能有命中"""
+        return self.pattern is not None and self.pattern.search(text) is not None
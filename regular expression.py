@@ -1,19 +1,146 @@
 import re
 
+from matcher_cache import get_matcher
+from prefilter import Prefilter
+from spans import mask_spans, select_spans
+
+
+# 单个节点下超过这个数量的分支时按首字符二分，先用字符类前瞻选择一半，
+# 避免正则引擎在数千个分支上逐个尝试
+MAX_BRANCHES = 8
+# 根节点的分支全部以字面字符开头时，正则引擎会先用首字符集合跳过不可能命中的位置，
+# 前瞻会关闭这一优化，所以根节点只在首字符很多（几乎每个位置都要尝试）时才二分
+ROOT_MAX_BRANCHES = 512
+# 前缀合并模式的分组嵌套深度上限，超过时 re 模块编译会递归过深
+MAX_GROUP_DEPTH = 200
+
+
+def _alternation(items, max_branches=MAX_BRANCHES):
+    # items: 按字符排序的 (字符, 子节点模式)
+    if len(items) > max_branches:
+        middle = len(items) // 2
+        left, right = items[:middle], items[middle:]
+        char_range = f"{re.escape(left[0][0])}-{re.escape(left[-1][0])}"
+        return f"(?=[{char_range}])(?:{_alternation(left)})|{_alternation(right)}"
+    branches = [re.escape(char) + rest for char, rest in items if rest]
+    # 只剩一个字符的分支合并为字符类
+    leaves = [re.escape(char) for char, rest in items if not rest]
+    if len(leaves) == 1:
+        branches.append(leaves[0])
+    elif leaves:
+        branches.append(f"[{''.join(leaves)}]")
+    return '|'.join(branches)
+
+
+def _node_pattern(items, is_end, max_branches=MAX_BRANCHES):
+    # 同一节点的子分支首字符各不相同，不会互相回溯；
+    # 词在此结束时子分支整体可选，贪婪匹配保证优先取最长的词
+    if not items:
+        return ''
+    if is_end:
+        return f"(?:{_alternation(items, max_branches)})?"
+    if len(items) == 1:
+        return re.escape(items[0][0]) + items[0][1]
+    return f"(?:{_alternation(items, max_branches)})"
+
+
+def _group_levels(items, is_end, max_branches):
+    # 节点模式增加的分组嵌套层数（包括二分产生的前瞻分组）
+    levels = 1 if is_end or len(items) > 1 else 0
+    count = len(items)
+    while count > max_branches:
+        count = (count + 1) // 2
+        levels += 1
+    return levels
 
-def regular_expression_filter_words(text, words):
-    # 创建正则表达式模式，按长度排序避免短词覆盖长词
-    sorted_words = sorted(words, key=len, reverse=True)
-    pattern = '|'.join(re.escape(word) for word in sorted_words)
 
-    result = []
-    for match in re.finditer(pattern, text):
-        start_index = match.start()
-        end_index = match.end() - 1  
-        result.append((start_index, end_index))
+def flat_pattern(words):
+    """按长度降序排列的平铺多选，同样在每个起点匹配最长的词"""
+    return '|'.join(re.escape(word) for word in sorted(words, key=len, reverse=True))
 
-    for start_index, end_index in result[::-1]:
-        text = text[:start_index] + '*' * (end_index - start_index + 1) + text[end_index + 1:]
-    return text
 
- 
\ No newline at end of file
+def trie_pattern(words):
+    """按公共前缀合并词库，生成在每个起点匹配最长词的正则表达式"""
+    root = {}
+    for word in words:
+        node = root
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True
+    # 用显式栈后序生成各节点的模式，词很长时也不会超出 Python 的递归深度
+    results = {}  # id(节点) -> (模式, 分组嵌套深度)
+    stack = [(root, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if not expanded:
+            stack.append((node, True))
+            stack.extend((node[char], False) for char in node if char)
+            continue
+        chars = sorted(char for char in node if char)
+        children = [results.pop(id(node[char])) for char in chars]
+        items = [(char, pattern) for char, (pattern, _) in zip(chars, children)]
+        max_branches = ROOT_MAX_BRANCHES if node is root else MAX_BRANCHES
+        depth = max((child_depth for _, child_depth in children), default=0)
+        depth += _group_levels(items, '' in node, max_branches)
+        results[id(node)] = (_node_pattern(items, '' in node, max_branches), depth)
+    pattern, depth = results[id(root)]
+    if depth > MAX_GROUP_DEPTH:
+        # 分组嵌套过深时 re 模块编译会超出递归深度（例如词库包含一个长词的大量前缀），改用平铺多选
+        return flat_pattern(words)
+    return pattern
+
+
+class RegexMatcher:
+    def __init__(self, words):
+        self.words = words
+        self.word_ids = {}
+        for index, word in enumerate(words):
+            # 重复的词保留第一次出现的序号
+            if word and word not in self.word_ids:
+                self.word_ids[word] = index
+        # 按公共前缀合并的正则表达式，在每个起点匹配最长的词
+        alternation = trie_pattern(self.word_ids)
+        self.lengths = sorted({len(word) for word in self.word_ids}, reverse=True)
+        self.prefilter = Prefilter(self.word_ids)
+        self.pattern = re.compile(alternation) if self.word_ids else None
+        # 零宽前瞻，在每个起点找出最长的词
+        self.overlap_pattern = re.compile(f'(?=({alternation}))') if self.word_ids else None
+
+    def find_spans(self, text):
+        """返回所有命中记录 (start, end, word_id)，允许重叠"""
+        if self.overlap_pattern is None or not self.prefilter.may_match(text):
+            return []
+        result = []
+        for match in self.overlap_pattern.finditer(text):
+            start_index = match.start()
+            longest = match.group(1)
+            # 同一起点上更短的词一定是最长词的前缀
+            for length in self.lengths:
+                if length <= len(longest):
+                    word_id = self.word_ids.get(longest[:length])
+                    if word_id is not None:
+                        result.append((start_index, start_index + length - 1, word_id))
+        return result
+
+    def find_longest(self, text):
+        """从左到右匹配最长的词，返回互不重叠的命中记录"""
+        if self.pattern is None or not self.prefilter.may_match(text):
+            return []
+        result = []
+        for match in self.pattern.finditer(text):
+            start_index = match.start()
+            end_index = match.end() - 1
+            result.append((start_index, end_index, self.word_ids[match.group()]))
+        return result
+
+
+def find_spans(text, words, policy='all'):
+    matcher = get_matcher('regular_expression', words, RegexMatcher)
+    if policy == 'leftmost-longest':
+        return matcher.find_longest(text)
+    return select_spans(matcher.find_spans(text), policy)
+
+
+def regular_expression_filter_words(text, words):
+    matcher = get_matcher('regular_expression', words, RegexMatcher)
+    return mask_spans(text, matcher.find_longest(text))
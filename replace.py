@@ -1,25 +1,101 @@
-def replace_filter_words(text, words):
-    # 按长度排序，避免短词覆盖长词
-    sorted_words = sorted(words, key=len, reverse=True)
-
-    result = []
-    i = 0
-    while i < len(text):
-        found = False
-        # 检查是否匹配任何敏感词
-        for word in sorted_words:
-            if text[i:i+len(word)] == word:
-                start_index = i
-                end_index = i + len(word) - 1  
-                result.append((start_index, end_index))
-                i += len(word)  # 跳过已匹配的部分
-                found = True
-                break
-        if not found:
-            i += 1
-
-    # 倒序替换，避免位置偏移
-    for start_index, end_index in result[::-1]:
-        text = text[:start_index] + '*' * (end_index - start_index + 1) + text[end_index + 1:]
-    return text
+from matcher_cache import get_matcher
+from prefilter import Prefilter
+from spans import mask_spans, select_spans
+
+
+# 首字符相同的词超过这个数量时，再按第二个字符分桶
+BUCKET_SPLIT = 16
+
+
+class ReplaceMatcher:
+    def __init__(self, words):
+        self.words = words
+        word_ids = {}
+        for index, word in enumerate(words):
+            # 重复的词保留第一次出现的序号
+            if word and word not in word_ids:
+                word_ids[word] = index
+        # 按长度排序，避免短词覆盖长词
+        self.sorted_words = sorted(word_ids.items(), key=lambda item: len(item[0]), reverse=True)
+        self.prefilter = Prefilter(word_ids)
+
+        # 按首字符分桶，桶内保持长度降序；不是任何词首字符的位置只需一次字典查找
+        buckets = {}
+        for word, word_id in self.sorted_words:
+            buckets.setdefault(word[0], []).append((word, word_id))
+        # 大桶再按第二个字符分桶: 首字符 -> ({第二个字符: 候选词}, 单字词)
+        self.buckets = {}
+        for char, candidates in buckets.items():
+            if len(candidates) <= BUCKET_SPLIT:
+                self.buckets[char] = candidates
+                continue
+            second = {}
+            singles = []
+            for word, word_id in candidates:
+                if len(word) == 1:
+                    singles.append((word, word_id))
+                else:
+                    second.setdefault(word[1], []).append((word, word_id))
+            self.buckets[char] = (second, singles)
+
+    def candidates(self, text, i):
+        """返回可能从位置 i 开始的词，按长度降序"""
+        bucket = self.buckets.get(text[i])
+        if bucket is None or isinstance(bucket, list):
+            return bucket or ()
+        second, singles = bucket
+        # 多字词都比单字词长，先尝试
+        if i + 1 < len(text):
+            return second.get(text[i + 1], []) + singles
+        return singles
 
+    def find_spans(self, text):
+        """返回所有命中记录 (start, end, word_id)，允许重叠"""
+        if not self.prefilter.may_match(text):
+            return []
+        result = []
+        buckets = self.buckets
+        for i in range(len(text)):
+            if text[i] not in buckets:
+                continue
+            for word, word_id in self.candidates(text, i):
+                if text.startswith(word, i):
+                    result.append((i, i + len(word) - 1, word_id))
+        return result
+
+    def find_longest(self, text):
+        """从左到右贪心匹配最长的词，返回互不重叠的命中记录"""
+        if not self.prefilter.may_match(text):
+            return []
+        result = []
+        buckets = self.buckets
+        i = 0
+        while i < len(text):
+            if text[i] not in buckets:
+                i += 1
+                continue
+            found = False
+            # 检查是否匹配任何敏感词
+            for word, word_id in self.candidates(text, i):
+                if text.startswith(word, i):
+                    start_index = i
+                    end_index = i + len(word) - 1
+                    result.append((start_index, end_index, word_id))
+                    i += len(word)  # 跳过已匹配的部分
+                    found = True
+                    break
+            if not found:
+                i += 1
+        return result
+
+
+def find_spans(text, words, policy='all'):
+    matcher = get_matcher('replace', words, ReplaceMatcher)
+    if policy == 'leftmost-longest':
+        return matcher.find_longest(text)
+    return select_spans(matcher.find_spans(text), policy)
+
+
+def replace_filter_words(text, words):
+    matcher = get_matcher('replace', words, ReplaceMatcher)
+    return mask_spans(text, matcher.find_longest(text))
@@ -99,6 +99,11 @@ function initializeEventListeners() {
 
     // 下载按钮
     document.getElementById('downloadTxt').addEventListener('click', downloadTxtResult);
+    // 旧版页面没有下载音频按钮
+    const downloadAudioBtn = document.getElementById('downloadAudio');
+    if (downloadAudioBtn) {
+        downloadAudioBtn.addEventListener('click', downloadCensoredAudio);
+    }
 }
 
 // 文件拖拽处理
@@ -353,70 +358,31 @@ async function checkApiAvailability() {
 // 使用API处理
 async function processWithApi(filterMethod) {
     try {
-        // 1. 上传文件
+        // 1. 上传文件（服务器上已有相同内容时跳过上传）
         updateProcessStatus('preprocessing', 'processing');
         await updateProgress(0, 10, '正在上传音频文件...');
 
-        const formData = new FormData();
-        formData.append('audio', currentAudioFile);
-
-        const uploadResponse = await fetch('/api/upload', {
-            method: 'POST',
-            body: formData
-        });
-
-        if (!uploadResponse.ok) {
-            throw new Error('文件上传失败');
-        }
-
-        const uploadResult = await uploadResponse.json();
+        const uploadResult = await uploadAudioFile(currentAudioFile);
         updateProcessStatus('preprocessing', 'completed');
 
-        // 2. 加载Whisper模型
+        // 2. 流式处理：逐段接收识别和过滤结果并立即显示；浏览器不支持流式读取时改为提交任务并轮询
         updateProcessStatus('recognition', 'processing');
-        await updateProgress(10, 25, '🤖 加载 Whisper base 模型...');
-        await new Promise(resolve => setTimeout(resolve, 1000)); // 模拟加载时间
-
-        // 3. 语音识别和过滤
-        await updateProgress(25, 40, '🎵 开始转录音频（集成敏感词过滤）...');
-        await new Promise(resolve => setTimeout(resolve, 500));
-
-        await updateProgress(40, 70, '🔄 正在进行语音识别...');
-        await new Promise(resolve => setTimeout(resolve, 1000));
-
-        // 4. 发送处理请求
-        await updateProgress(70, 80, '🛡️ 正在应用敏感词过滤...');
-
-        const processResponse = await fetch('/api/process', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({
-                audio_file: uploadResult.filename,
-                sensitive_words: sensitiveWords,
-                filter_method: filterMethod
-            })
-        });
-
-        if (!processResponse.ok) {
-            const errorData = await processResponse.json();
-            throw new Error(errorData.error || '音频处理失败');
+        let processResult;
+        if (window.ReadableStream && window.TextDecoder) {
+            processResult = await streamProcess(uploadResult.filename, filterMethod);
+        } else {
+            processResult = await submitJob(uploadResult.filename, filterMethod);
         }
 
-        const processResult = await processResponse.json();
-
-        // 5. 处理完成
+        // 3. 处理完成
         updateProcessStatus('recognition', 'completed');
         updateProcessStatus('filtering', 'completed');
-        await updateProgress(80, 95, '✅ 转录完成，正在生成结果...');
-        await new Promise(resolve => setTimeout(resolve, 500));
-
         await updateProgress(95, 100, '🎉 处理完成！');
 
         // 转换结果格式
         currentResults = {
-            audioFile: processResult.audio_file,
+            // 服务器按内容哈希保存文件，显示时使用原文件名
+            audioFile: currentAudioFile.name || processResult.audio_file,
             language: processResult.language,
             duration: processResult.duration,
             processTime: processResult.process_time,
@@ -433,7 +399,9 @@ async function processWithApi(filterMethod) {
                 filtered: seg.filtered
             })),
             stats: processResult.stats,
-            resultFile: processResult.result_file
+            resultFile: processResult.result_file,
+            transcriptId: processResult.transcript_id,
+            censoredAudio: processResult.censored_audio
         };
 
     } catch (error) {
@@ -442,6 +410,189 @@ async function processWithApi(filterMethod) {
     }
 }
 
+// 计算文件内容的 SHA-256（需要安全上下文，如 localhost 或 https），不可用时返回 null
+async function hashFile(file) {
+    if (!window.crypto || !window.crypto.subtle) {
+        return null;
+    }
+    const digest = await window.crypto.subtle.digest('SHA-256', await file.arrayBuffer());
+    return Array.from(new Uint8Array(digest))
+        .map(byte => byte.toString(16).padStart(2, '0'))
+        .join('');
+}
+
+// 上传音频：先按内容哈希查询服务器是否已有相同文件，已有时直接复用
+async function uploadAudioFile(file) {
+    const ext = file.name.slice(file.name.lastIndexOf('.')).toLowerCase();
+    const sha256 = await hashFile(file);
+    if (sha256) {
+        const checkResponse = await fetch(`/api/upload/${sha256}?ext=${encodeURIComponent(ext)}`);
+        if (checkResponse.ok) {
+            console.log('服务器上已有相同的音频文件，跳过上传');
+            return await checkResponse.json();
+        }
+    }
+
+    const formData = new FormData();
+    formData.append('audio', file);
+
+    const uploadResponse = await fetch('/api/upload', {
+        method: 'POST',
+        body: formData
+    });
+
+    if (!uploadResponse.ok) {
+        throw new Error('文件上传失败');
+    }
+
+    return await uploadResponse.json();
+}
+
+// 提交后台处理任务，轮询直到转录和过滤完成
+async function submitJob(filename, filterMethod) {
+    await updateProgress(10, 15, '🤖 正在提交处理任务...');
+
+    const processResponse = await fetch('/api/process', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({
+            audio_file: filename,
+            sensitive_words: sensitiveWords,
+            filter_method: filterMethod
+        })
+    });
+
+    if (!processResponse.ok) {
+        const errorData = await processResponse.json();
+        throw new Error(errorData.error || '音频处理失败');
+    }
+
+    const jobInfo = await processResponse.json();
+    return await waitForJob(jobInfo.job_id);
+}
+
+// 流式处理：读取后端推送的 JSON 行，每收到一个分段就显示出来，返回最终结果
+async function streamProcess(filename, filterMethod) {
+    await updateProgress(10, 15, '🤖 正在进行语音识别...');
+    const startTime = performance.now();
+
+    const response = await fetch('/api/process/stream', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({
+            audio_file: filename,
+            sensitive_words: sensitiveWords,
+            filter_method: filterMethod
+        })
+    });
+
+    if (!response.ok) {
+        const errorData = await response.json();
+        throw new Error(errorData.error || '音频处理失败');
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    const streamSegments = [];
+    let buffer = '';
+    let result = null;
+
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+
+        for (const line of lines) {
+            if (!line.trim()) continue;
+            const event = JSON.parse(line);
+
+            if (event.type === 'segment') {
+                if (streamSegments.length === 0) {
+                    // 首个分段到达后关闭加载界面，之后的分段逐个追加
+                    const firstSegmentTime = (performance.now() - startTime) / 1000;
+                    console.log(`首个分段用时: ${firstSegmentTime.toFixed(2)} 秒`);
+                    hideLoading();
+                    showStreamResults();
+                }
+                streamSegments[event.index] = event;
+                appendStreamSegment(event, streamSegments);
+            } else if (event.type === 'update') {
+                streamSegments[event.index].filtered = event.filtered;
+                updateStreamSegment(event.index, streamSegments);
+            } else if (event.type === 'done') {
+                console.log(`流式处理完成，首个分段 ${event.first_segment_seconds.toFixed(2)} 秒，` +
+                            `总耗时 ${event.total_seconds.toFixed(2)} 秒`);
+                result = event.result;
+            } else if (event.type === 'error') {
+                throw new Error(event.error);
+            }
+        }
+    }
+
+    if (!result) {
+        throw new Error('处理中断，没有收到完整结果');
+    }
+    return result;
+}
+
+// 流式处理开始显示分段时，清空上一次的结果
+function showStreamResults() {
+    resultsSection.style.display = 'block';
+    document.getElementById('simplifiedText').textContent = '';
+    document.getElementById('filteredText').textContent = '';
+    document.getElementById('segmentsContainer').innerHTML = '';
+}
+
+function appendStreamSegment(segment, streamSegments) {
+    const container = document.getElementById('segmentsContainer');
+    container.appendChild(createSegmentElement(segment, segment.index));
+    document.getElementById('simplifiedText').textContent += segment.simplified || segment.original;
+    document.getElementById('filteredText').textContent = streamSegments.map(seg => seg.filtered).join('');
+}
+
+// 后面的分段完成跨分段的敏感词时，更新之前分段的过滤结果
+function updateStreamSegment(index, streamSegments) {
+    const container = document.getElementById('segmentsContainer');
+    const segmentDiv = container.children[index];
+    if (segmentDiv) {
+        segmentDiv.replaceWith(createSegmentElement(streamSegments[index], index));
+    }
+    document.getElementById('filteredText').textContent = streamSegments.map(seg => seg.filtered).join('');
+}
+
+// 轮询后台任务，返回任务结果
+async function waitForJob(jobId, interval = 1000) {
+    while (true) {
+        const response = await fetch(`/api/jobs/${jobId}`);
+        if (!response.ok) {
+            const errorData = await response.json();
+            throw new Error(errorData.error || '查询任务状态失败');
+        }
+
+        const job = await response.json();
+        // 任务进度映射到 15% - 95% 的进度条区间
+        const progress = Math.round(15 + job.progress * 0.8);
+        progressFill.style.width = `${progress}%`;
+        progressText.textContent = `${progress}%`;
+        loadingText.textContent = job.message;
+
+        if (job.status === 'done') {
+            return job.result;
+        }
+        if (job.status === 'failed') {
+            throw new Error(job.error || '音频处理失败');
+        }
+
+        await new Promise(resolve => setTimeout(resolve, interval));
+    }
+}
+
 // 显示加载界面
 function showLoading() {
     loadingOverlay.style.display = 'flex';
@@ -605,10 +756,16 @@ function displaySegments() {
     container.innerHTML = '';
     
     currentResults.segments.forEach((segment, index) => {
-        const segmentDiv = document.createElement('div');
-        segmentDiv.className = 'segment-item';
-        
-        segmentDiv.innerHTML = `
+        container.appendChild(createSegmentElement(segment, index));
+    });
+}
+
+// 生成单个分段的显示元素
+function createSegmentElement(segment, index) {
+    const segmentDiv = document.createElement('div');
+    segmentDiv.className = 'segment-item';
+
+    segmentDiv.innerHTML = `
             <div class="segment-header">
                 <span>分段 ${index + 1}</span>
                 <span>[${segment.start.toFixed(2)}s - ${segment.end.toFixed(2)}s]</span>
@@ -625,9 +782,8 @@ function displaySegments() {
                 </div>
             </div>
         `;
-        
-        container.appendChild(segmentDiv);
-    });
+
+    return segmentDiv;
 }
 
 // 高亮敏感词
@@ -710,6 +866,43 @@ ${'-'.repeat(30)}
 
 
 
+// 下载消音音频：处理结果中还没有时，在缓存的转录结果上生成（不重新识别）
+async function downloadCensoredAudio() {
+    if (!currentResults) return;
+
+    try {
+        if (!currentResults.censoredAudio) {
+            const response = await fetch('/api/refilter', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json'
+                },
+                body: JSON.stringify({
+                    transcript_id: currentResults.transcriptId,
+                    sensitive_words: sensitiveWords,
+                    filter_method: currentResults.filterMethod,
+                    censor_audio: 'tone'
+                })
+            });
+            const data = await response.json();
+            if (!response.ok) {
+                throw new Error(data.error || '生成消音音频失败');
+            }
+            currentResults.censoredAudio = data.censored_audio;
+        }
+
+        // 直接链接到下载接口，大文件不经过内存
+        const a = document.createElement('a');
+        a.href = `/api/download/audio/${currentResults.censoredAudio}`;
+        a.download = currentResults.censoredAudio;
+        document.body.appendChild(a);
+        a.click();
+        document.body.removeChild(a);
+    } catch (error) {
+        alert(`下载过滤音频失败: ${error.message}`);
+    }
+}
+
 // 下载文件
 function downloadFile(content, filename, mimeType) {
     const blob = new Blob([content], { type: mimeType });
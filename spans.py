@@ -0,0 +1,61 @@
+"""
+命中区间处理
+各过滤算法统一使用 (start, end) 闭区间表示命中位置，查询接口返回 (start, end, word_id)，
+在这里按重叠策略筛选、合并并一次性完成替换
+"""
+
+# 重叠策略:
+#   all              - 所有命中，允许重叠
+#   leftmost-longest - 从左到右，每个起点取最长的词，跳过与已选区间重叠的命中
+#   non-overlapping  - 按结束位置最早优先（同一结束位置取最长），跳过重叠命中
+POLICIES = ('all', 'leftmost-longest', 'non-overlapping')
+
+
+def select_spans(spans, policy='all'):
+    """按重叠策略筛选 (start, end, word_id) 命中记录，结果按起点排序"""
+    if policy == 'all':
+        return sorted(spans)
+    if policy == 'leftmost-longest':
+        ordered = sorted(spans, key=lambda span: (span[0], -span[1]))
+    elif policy == 'non-overlapping':
+        ordered = sorted(spans, key=lambda span: (span[1], span[0]))
+    else:
+        raise ValueError(f"未知的重叠策略: {policy}，可选: {', '.join(POLICIES)}")
+
+    selected = []
+    last_end = -1
+    for span in ordered:
+        if span[0] > last_end:
+            selected.append(span)
+            last_end = span[1]
+    return selected
+
+
+def merge_spans(spans):
+    """合并重叠或相邻的命中区间，返回按起点排序的 [start, end] 列表"""
+    merged = []
+    for span in sorted(spans):
+        start, end = span[0], span[1]
+        if end < start:
+            # 空词产生的空区间
+            continue
+        if merged and start <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def mask_spans(text, spans, mask_char='*'):
+    """将所有命中区间替换为屏蔽字符，单次遍历拼接输出"""
+    if not spans:
+        return text
+    pieces = []
+    position = 0
+    for start, end in merge_spans(spans):
+        pieces.append(text[position:start])
+        pieces.append(mask_char * (end - start + 1))
+        position = end + 1
+    pieces.append(text[position:])
+    return ''.join(pieces)
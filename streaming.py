@@ -0,0 +1,116 @@
+"""
+跨分段的流式敏感词过滤
+在 Whisper 分段之间保留自动机状态和长度有界的尾部缓冲，跨分段出现的敏感词也能被屏蔽，
+每段输入后立即输出已确定的结果，延迟不超过 (最长词长 - 1) 个字符
+"""
+
+from bisect import bisect_right
+
+import engines
+
+# 支持在分段之间保留状态的引擎
+STREAMING_ENGINES = ('DFA', 'aho_corasick')
+
+
+class StreamingFilter:
+    def __init__(self, words, engine='DFA', mask_char='*'):
+        if engine not in STREAMING_ENGINES:
+            raise ValueError(f"流式过滤只支持: {', '.join(STREAMING_ENGINES)}")
+        self.engine = engine
+        self.matcher = engines.compile_engine(engine, words)
+        self.mask_char = mask_char
+        # 尾部缓冲最多保留的字符数，即输出延迟的上限
+        self.max_delay = max(max((len(word) for word in words), default=0) - 1, 0)
+        self.reset()
+
+    def reset(self):
+        self.position = 0  # 已输入的字符总数
+        self.pending = []  # 尚未输出的字符
+        self.pending_start = 0  # pending[0] 在输入流中的位置
+        self.spans = []  # 所有命中记录，位置相对于整个输入流
+        self._state = 0
+        self._search = None  # pyahocorasick 的搜索迭代器
+
+    def _scan(self, chunk):
+        if self.engine == 'DFA':
+            spans, self._state = self.matcher.scan(chunk, self._state, self.position)
+            return spans
+        automaton = self.matcher.automaton
+        if automaton is None:
+            return []
+        if self._search is None:
+            self._search = automaton.iter(chunk)
+        else:
+            # reset=False: 延续自动机状态，结束位置也继续累加
+            self._search.set(chunk, False)
+        return [(end_index - length + 1, end_index, word_id)
+                for end_index, (word_id, length) in self._search]
+
+    def feed(self, chunk):
+        """输入一段文本，返回已经可以确定的过滤结果"""
+        self.pending.extend(chunk)
+        for start, end, word_id in self._scan(chunk):
+            self.spans.append((start, end, word_id))
+            # 命中的起点一定还在尾部缓冲内
+            for index in range(start - self.pending_start, end - self.pending_start + 1):
+                self.pending[index] = self.mask_char
+        self.position += len(chunk)
+        return self._emit(self.position - self.max_delay)
+
+    def flush(self):
+        """输入结束，返回缓冲中剩余的全部结果"""
+        return self._emit(self.position)
+
+    def _emit(self, until):
+        count = max(until - self.pending_start, 0)
+        output = ''.join(self.pending[:count])
+        del self.pending[:count]
+        self.pending_start += count
+        return output
+
+
+class SegmentFilter:
+    """
+    逐段过滤并立即返回每段的当前结果，不等待尾部缓冲；
+    之后的分段完成一个跨分段的命中时，前面分段的结果会随之更新
+    """
+
+    def __init__(self, words, engine='DFA', mask_char='*'):
+        self.stream = StreamingFilter(words, engine, mask_char)
+        self.mask_char = mask_char
+        self.chars = []  # 到目前为止的过滤结果
+        self.starts = []  # 各分段在输入流中的起点
+
+    def add(self, text):
+        """输入一个分段，返回 {分段序号: 过滤结果}，包括新分段和结果有变化的之前分段"""
+        index = len(self.starts)
+        self.starts.append(len(self.chars))
+        self.chars.extend(text)
+        span_count = len(self.stream.spans)
+        # 命中在结束字符输入时就能确定，这里只用它的命中记录
+        self.stream.feed(text)
+        changed = {index}
+        for start, end, _ in self.stream.spans[span_count:]:
+            self.chars[start:end + 1] = self.mask_char * (end - start + 1)
+            changed.update(range(bisect_right(self.starts, start) - 1, index))
+        return {segment: self.segment(segment) for segment in sorted(changed)}
+
+    def segment(self, index):
+        start = self.starts[index]
+        end = self.starts[index + 1] if index + 1 < len(self.starts) else len(self.chars)
+        return ''.join(self.chars[start:end])
+
+
+def filter_segments(texts, words, engine='DFA'):
+    """
+    按顺序过滤多个相邻的分段，跨分段的敏感词也会被屏蔽
+    屏蔽不改变长度，按原分段长度切分输出即可得到各分段的结果
+    """
+    stream = StreamingFilter(words, engine)
+    output = ''.join(stream.feed(text) for text in texts) + stream.flush()
+    result = []
+    position = 0
+    for text in texts:
+        result.append(output[position:position + len(text)])
+        position += len(text)
+    return result
@@ -0,0 +1,220 @@
+"""
+过滤引擎的回归测试（不依赖 Whisper）
+用随机词库和文本把各引擎与参考实现逐项比较
+
+用法:
+    python -m pytest -q test_engines.py
+"""
+
+import os
+import random
+import tempfile
+import unittest
+
+import artifacts
+import engines
+import parallel
+from matcher_cache import FrozenWords, fingerprint
+from spans import select_spans
+
+# 小字母表让随机词在随机文本中大量出现，也覆盖前缀重叠和重复词
+ALPHABET = '小狼开心快乐我你他'
+
+
+def setUpModule():
+    # flat_dfa 的文件写到临时目录，不在工作目录中留下缓存文件
+    global flat_dir, original_flat_dir
+    flat_dir = tempfile.TemporaryDirectory()
+    flat_dfa = engines.load_engine('flat_dfa')
+    original_flat_dir, flat_dfa.FLAT_DIR = flat_dfa.FLAT_DIR, flat_dir.name
+
+
+def tearDownModule():
+    engines.load_engine('flat_dfa').FLAT_DIR = original_flat_dir
+    flat_dir.cleanup()
+
+
+def random_words(rng, count, max_len=4):
+    return [''.join(rng.choice(ALPHABET) for _ in range(rng.randint(1, max_len))) for _ in range(count)]
+
+
+def random_text(rng, length):
+    return ''.join(rng.choice(ALPHABET + ' ，') for _ in range(length))
+
+
+def matched_words(spans, words):
+    """(start, end, 词) 形式，同一个词重复出现时不同引擎可能报告不同的序号"""
+    return sorted((start, end, words[word_id]) for start, end, word_id in spans)
+
+
+class DoubleArrayTrieTest(unittest.TestCase):
+    def setUp(self):
+        self.trie_tree = engines.load_engine('trie_tree')
+
+    def test_matches_dict_tree(self):
+        rng = random.Random(6)
+        for _ in range(200):
+            words = random_words(rng, rng.randint(1, 30))
+            text = random_text(rng, 60)
+            expected = self.trie_tree.build_tree(words).find_spans(text)
+            actual = self.trie_tree.DoubleArrayTrie(words).find_spans(text)
+            self.assertEqual(matched_words(actual, words), matched_words(expected, words))
+
+    def test_search_matches_dict_tree(self):
+        rng = random.Random(7)
+        words = random_words(rng, 50)
+        trie = self.trie_tree.DoubleArrayTrie(words)
+        tree = self.trie_tree.build_tree(words)
+        for word in random_words(rng, 200):
+            self.assertEqual(trie.search(word), tree.search(word))
+
+    def test_empty_lexicon(self):
+        for words in ([], [''], ['', '']):
+            self.assertEqual(self.trie_tree.trie_tree_filter_words('abc', words), 'abc')
+            self.assertEqual(self.trie_tree.DoubleArrayTrie(words).find_spans('abc'), [])
+
+
+class EngineTest(unittest.TestCase):
+    def engine_names(self):
+        for name in engines.ENGINES:
+            try:
+                engines.load_engine(name)
+            except ImportError:
+                # 可选依赖未安装
+                continue
+            yield name
+
+    def test_empty_lexicon(self):
+        for name in self.engine_names():
+            for words in ([], [''], ['', '']):
+                with self.subTest(engine=name, words=words):
+                    matcher = engines.compile_engine(name, words)
+                    self.assertEqual(matcher.find_spans('小狼 abc'), [])
+
+    def test_exact_engines_match_dfa(self):
+        # 抗干扰和拼音引擎的命中本来就比精确匹配多，另外单独测试
+        exact = [name for name in self.engine_names() if not name.startswith(('noise_', 'pinyin'))]
+        rng = random.Random(8)
+        for _ in range(30):
+            words = random_words(rng, rng.randint(1, 20))
+            text = random_text(rng, 80)
+            reference = engines.compile_engine('DFA', words).find_spans(text)
+            for name in exact:
+                policy = engines.default_policy(name)
+                with self.subTest(engine=name, words=words, text=text):
+                    spans = engines.scan(engines.compile_engine(name, words), text, policy)
+                    self.assertEqual(matched_words(spans, words),
+                                     matched_words(select_spans(reference, policy), words))
+
+
+class RegexMatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.regular_expression = engines.load_engine('regular_expression')
+
+    def test_long_word(self):
+        # 逐字符递归生成模式时，约 500 个字符以上的词会超出递归深度
+        word = '小狼' * 600
+        matcher = self.regular_expression.RegexMatcher([word, '开心'])
+        self.assertEqual(matcher.find_longest('我' + word + '开心'), [(1, 1200, 0), (1201, 1202, 1)])
+
+    def test_deeply_nested_prefixes(self):
+        words = ['小' * length for length in range(1, 800)]
+        matcher = self.regular_expression.RegexMatcher(words)
+        self.assertEqual(matcher.find_longest('小' * 5), [(0, 4, 4)])
+        self.assertEqual(len(matcher.find_spans('小' * 5)), 15)
+
+
+class NoiseTolerantTest(unittest.TestCase):
+    def test_engines_agree_with_stripped_scan(self):
+        rng = random.Random(10)
+        for _ in range(50):
+            words = random_words(rng, rng.randint(1, 10))
+            # random_text 中的空格和逗号都是干扰字符
+            text = random_text(rng, 60)
+            positions = [i for i, char in enumerate(text) if char not in ' ，']
+            stripped = ''.join(text[i] for i in positions)
+            expected = [(positions[start], positions[end], word_id) for start, end, word_id
+                        in engines.compile_engine('DFA', words).find_spans(stripped)]
+            for name in ('noise_dfa', 'noise_trie'):
+                with self.subTest(engine=name, words=words, text=text):
+                    spans = engines.compile_engine(name, words).find_spans(text)
+                    self.assertEqual(matched_words(spans, words), matched_words(expected, words))
+
+
+class PinyinMatcherTest(unittest.TestCase):
+    def setUp(self):
+        try:
+            self.homophone = engines.load_engine('pinyin')
+        except ImportError:
+            self.skipTest('未安装 pypinyin')
+
+    def test_matches_homophones(self):
+        matcher = self.homophone.PinyinMatcher(['小狼', 'AV'])
+        self.assertEqual(matcher.find_spans('遇到了小浪和 av'), [(3, 4, 0), (7, 8, 1)])
+        self.assertIsNone(matcher.dfa.prefilter)
+
+    def test_long_text_not_cached(self):
+        self.homophone._cached_convert.cache_clear()
+        text = '小浪' * self.homophone.MAX_CACHED_TEXT_LENGTH
+        matcher = self.homophone.PinyinMatcher(['小狼'])
+        self.assertEqual(len(matcher.find_spans(text)), len(text) // 2)
+        self.assertEqual(self.homophone._cached_convert.cache_info().currsize, 0)
+
+
+class MatcherCacheTest(unittest.TestCase):
+    def test_in_place_edits(self):
+        dfa = engines.load_engine('DFA')
+        words = ['小狼', '开心']
+        self.assertEqual(dfa.DFA_filter_words('小狼快乐开心', words), '**快乐**')
+        words[0] = '快乐'
+        self.assertEqual(dfa.DFA_filter_words('小狼快乐开心', words), '小狼****')
+        words.sort()
+        self.assertEqual(matched_words(dfa.find_spans('小狼快乐开心', words), words),
+                         [(2, 3, '快乐'), (4, 5, '开心')])
+
+    def test_frozen_words(self):
+        words = FrozenWords(['小狼', '开心'])
+        self.assertEqual(words.fingerprint, fingerprint(['小狼', '开心']))
+        matcher = engines.compile_engine('DFA', words)
+        self.assertIs(engines.compile_engine('DFA', list(words)), matcher)
+
+
+class ArtifactTest(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+
+    def test_rebuilds_missing_flat_file(self):
+        words = ['小狼', '开心']
+        path = os.path.join(self.tempdir.name, 'flat_dfa.swfa')
+        artifacts.compile_artifact('flat_dfa', words, path)
+        flat_path = artifacts.load_artifact('flat_dfa', words, path).path
+        os.remove(flat_path)
+        with self.assertRaises(artifacts.StaleArtifactError):
+            artifacts.load_artifact('flat_dfa', words, path)
+        matcher = artifacts.load_or_compile('flat_dfa', words, path)
+        self.assertEqual(matcher.find_spans('小狼很开心'), [(0, 1, 0), (3, 4, 1)])
+        self.assertTrue(os.path.exists(flat_path))
+
+
+class ParallelScannerTest(unittest.TestCase):
+    def test_matches_serial_scan(self):
+        rng = random.Random(9)
+        words = random_words(rng, 20)
+        text = random_text(rng, 500)
+        expected = engines.compile_engine('DFA', words).find_spans(text)
+        self.assertEqual(sorted(parallel.find_spans_parallel('DFA', text, words, workers=2, chunk_size=13)),
+                         sorted(expected))
+
+    def test_rejects_unbounded_engines(self):
+        # 干扰字符让命中跨越块之间的重叠区，分块扫描会漏掉这些命中
+        text = ('啊' * 9 + '小  ,  狼') * 50
+        for name in ('noise_dfa', 'noise_trie'):
+            with self.subTest(engine=name):
+                self.assertEqual(len(engines.compile_engine(name, ['小狼']).find_spans(text)), 50)
+                with self.assertRaises(ValueError):
+                    parallel.find_spans_parallel(name, text, ['小狼'], chunk_size=13)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+"""
+服务端词库的回归测试
+
+用法:
+    python -m pytest -q test_lexicon.py
+"""
+
+import os
+import time
+import tempfile
+import unittest
+
+import engines
+from lexicon import LexiconStore
+
+
+def wait_for_version(store, version, timeout=10):
+    deadline = time.time() + timeout
+    while store.current.version < version and time.time() < deadline:
+        time.sleep(0.01)
+    return store.current
+
+
+class LexiconStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tempdir.name, 'lexicon.txt')
+        # 不依赖 numpy、pyahocorasick 等可选依赖的引擎
+        self.engine_names = ['DFA', 'trie_tree', 'replace', 'regular_expression']
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_empty_lexicon_file(self):
+        open(self.path, 'w', encoding='utf-8').close()
+        store = LexiconStore(self.path, self.engine_names)
+        self.assertEqual(store.current.words, ())
+        self.assertEqual(sorted(store.current.matchers), sorted(self.engine_names))
+        self.assertEqual(store.current.errors, {})
+
+    def test_update_to_empty_lexicon(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('小狼\n')
+        store = LexiconStore(self.path, self.engine_names)
+        store.save([])
+        current = wait_for_version(store, 2)
+        self.assertEqual((current.version, current.words), (2, ()))
+        self.assertIsNone(store.last_error)
+
+    def test_failing_engine_is_skipped(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('小狼\n开心\n')
+        engines.ENGINES['broken'] = ('no_such_engine_module.py', 'Missing', 'all')
+        try:
+            store = LexiconStore(self.path, self.engine_names + ['broken'])
+        finally:
+            del engines.ENGINES['broken']
+        self.assertEqual(store.current.words, ('小狼', '开心'))
+        self.assertEqual(sorted(store.current.matchers), sorted(self.engine_names))
+        self.assertIn('broken', store.current.errors)
+
+    def test_artifacts_reused(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('小狼\n开心\n')
+        artifact_dir = os.path.join(self.tempdir.name, 'artifacts')
+        engine_names = ['DFA', 'flat_dfa']
+        store = LexiconStore(self.path, engine_names, artifact_dir=artifact_dir)
+        paths = [os.path.join(artifact_dir, f"{engine}.swfa") for engine in engine_names]
+        mtimes = [os.stat(path).st_mtime_ns for path in paths]
+        # 词库未变时重新启动直接读取文件
+        store = LexiconStore(self.path, engine_names, artifact_dir=artifact_dir)
+        self.assertEqual([os.stat(path).st_mtime_ns for path in paths], mtimes)
+        self.assertEqual(store.current.matchers['flat_dfa'].find_spans('小狼很开心'), [(0, 1, 0), (3, 4, 1)])
+        store.save(['快乐'])
+        current = wait_for_version(store, 2)
+        self.assertEqual(current.matchers['DFA'].find_spans('小狼很快乐'), [(3, 4, 0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+"""
+Whisper 模型管理的回归测试（用占位对象代替模型）
+
+用法:
+    python -m pytest -q test_models.py
+"""
+
+import threading
+import unittest
+
+from models import ModelManager
+
+
+class ModelManagerTest(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        manager = ModelManager(lambda name: object(), max_resident=2)
+        for name in ('tiny', 'base', 'small'):
+            manager.get(name)
+        self.assertEqual(manager.loaded(), ['base', 'small'])
+
+    def test_keeps_new_model_when_others_busy(self):
+        manager = ModelManager(lambda name: object(), max_resident=1)
+        started = threading.Event()
+        finish = threading.Event()
+
+        def hold():
+            with manager.use('tiny'):
+                started.set()
+                finish.wait()
+
+        thread = threading.Thread(target=hold)
+        thread.start()
+        started.wait()
+        try:
+            model = manager.get('base')
+            # 正在使用的模型不能卸载，刚加载的模型也必须保留
+            self.assertEqual(manager.loaded(), ['tiny', 'base'])
+            self.assertIs(manager.get('base'), model)
+        finally:
+            finish.set()
+            thread.join()
+
+
+if __name__ == '__main__':
+    unittest.main()
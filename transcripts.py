@@ -0,0 +1,108 @@
+"""
+转录结果缓存
+按 (音频内容哈希, 模型, 语言) 缓存 Whisper 的原始转录结果（分段、词级时间戳、原文和简体文本），
+更换词库或过滤方法时直接在缓存的转录结果上重新过滤，不再重新识别
+"""
+
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+from atomic import atomic_write
+
+# 计算文件哈希时每次读取的字节数
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def file_sha256(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+class TranscriptCache:
+    def __init__(self, folder, max_memory_entries=64):
+        self.folder = folder
+        self.max_memory_entries = max_memory_entries
+        os.makedirs(folder, exist_ok=True)
+        self._entries = OrderedDict()
+        # (路径, 修改时间, 大小) -> 内容哈希，同一文件不重复计算
+        self._file_hashes = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def audio_hash(self, path):
+        stat = os.stat(path)
+        file_key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            digest = self._file_hashes.get(file_key)
+        if digest is None:
+            digest = file_sha256(path)
+            with self._lock:
+                self._file_hashes[file_key] = digest
+        return digest
+
+    def remember_hash(self, path, digest):
+        """记录已知的文件内容哈希（例如上传时已经计算过），之后不再重新读取文件"""
+        stat = os.stat(path)
+        with self._lock:
+            self._file_hashes[(os.path.abspath(path), stat.st_mtime_ns, stat.st_size)] = digest
+
+    def key(self, path, model, language, windowed=False):
+        """
+        转录结果的缓存键，同时作为 transcript_id 返回给前端
+        流式处理按窗口分别转录，准确率低于整段转录，使用单独的键，整段转录不会复用它
+        """
+        suffix = '_stream' if windowed else ''
+        return f"{self.audio_hash(path)}_{model}_{language or 'auto'}{suffix}"
+
+    def _path(self, key):
+        return os.path.join(self.folder, f"{key}.json")
+
+    def get(self, key):
+        """返回缓存的转录结果，不存在时返回 None"""
+        if not key or os.path.basename(key) != key:
+            return None
+        with self._lock:
+            transcript = self._entries.get(key)
+            if transcript is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return transcript
+        path = self._path(key)
+        if not os.path.exists(path):
+            with self._lock:
+                self.misses += 1
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            transcript = json.load(f)
+        with self._lock:
+            self.hits += 1
+            self._remember(key, transcript)
+        return transcript
+
+    def put(self, key, transcript):
+        # 原子替换，避免并发读到写了一半的文件
+        with atomic_write(self._path(key), 'w', encoding='utf-8') as f:
+            json.dump(transcript, f, ensure_ascii=False, default=float)
+        with self._lock:
+            self._remember(key, transcript)
+
+    def _remember(self, key, transcript):
+        self._entries[key] = transcript
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_memory_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'memory_entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses
+            }
@@ -1,19 +1,30 @@
+from array import array
+from collections import Counter
+
+from matcher_cache import get_matcher
+from prefilter import Prefilter
+from spans import mask_spans, select_spans
+
+
 class TreeNode:
     def __init__(self):
         self.children = {}
         self.is_end = False
+        self.word_id = None
  
  
 class Tree:
     def __init__(self):
         self.root = TreeNode()
  
-    def insert(self, word):
+    def insert(self, word, word_id=None):
         node = self.root
         for char in word:
             if char not in node.children:
                 node.children[char] = TreeNode()
             node = node.children[char]
+        if not node.is_end:
+            node.word_id = word_id
         node.is_end = True
  
     def search(self, word):
@@ -24,23 +35,165 @@ class Tree:
             node = node.children[char]
         return node.is_end
  
+    def find_spans(self, text):
+        """返回所有命中记录 (start, end, word_id)，允许重叠"""
+        result = []
+        for i in range(len(text)):
+            node = self.root
+            for j in range(i, len(text)):
+                if text[j] not in node.children:
+                    break
+                node = node.children[text[j]]
+                if node.is_end:
+                    result.append((i, j, node.word_id))
+        return result
  
-def trie_tree_filter_words(text, words):
+ 
+# 放置子节点时连续失败超过该次数，就把搜索起点移到成功的位置
+MAX_PLACEMENT_ATTEMPTS = 128
+ 
+ 
+class DoubleArrayTrie:
+    """
+    双数组字典树
+    状态 s 经字符编码 c 转移到 t = base[s] + c，且要求 check[t] == s；
+    value[t] 为以 t 结尾的词序号，非词尾为 -1
+    """
+    def __init__(self, words):
+        self.words = words
+        self.prefilter = Prefilter(words)
+        self.build()
+ 
+    def build(self):
+        word_ids = {}
+        for index, word in enumerate(self.words):
+            # 重复的词保留第一次出现的序号
+            if word and word not in word_ids:
+                word_ids[word] = index
+        # 按出现频率分配字符编码，高频字符编码小，数组更紧凑
+        counts = Counter(char for word in word_ids for char in word)
+        self.codes = {char: code for code, (char, _) in enumerate(counts.most_common(), 1)}
+ 
+        keys = sorted(word_ids)
+        base = [0]
+        check = [-2]  # 根节点占用 0 号位置，-1 表示空闲
+        value = [-1]
+        first_free = 1
+        # 栈中每项为 (状态, 深度, 词区间)，区间内的词共享长度为深度的前缀；
+        # 空词库（或只有空词）时只有根节点
+        stack = [(0, 0, 0, len(keys))] if keys else []
+        while stack:
+            state, depth, lo, hi = stack.pop()
+            if len(keys[lo]) == depth:
+                value[state] = word_ids[keys[lo]]
+                lo += 1
+            if lo == hi:
+                continue
+ 
+            # 按下一个字符分组，得到子节点列表
+            children = []
+            start = lo
+            for i in range(lo + 1, hi + 1):
+                if i == hi or keys[i][depth] != keys[start][depth]:
+                    children.append((self.codes[keys[start][depth]], start, i))
+                    start = i
+ 
+            # 只在空闲位置上尝试放置第一个子节点，寻找能放下所有子节点的 base
+            first_code = children[0][0]
+            span = max(code for code, _, _ in children) - first_code
+            position = max(first_free, first_code + 1)
+            attempts = 0
+            while True:
+                if position + span >= len(check):
+                    grow = max(span + 1, len(check) // 2)
+                    base.extend([0] * grow)
+                    check.extend([-1] * grow)
+                    value.extend([-1] * grow)
+                    continue
+                # list.index 在 C 层跳过已占用的位置
+                try:
+                    position = check.index(-1, position)
+                except ValueError:
+                    position = len(check)
+                    continue
+                b = position - first_code
+                if position + span < len(check) and all(
+                        check[b + code] == -1 for code, _, _ in children):
+                    break
+                position += 1
+                attempts += 1
+ 
+            base[state] = b
+            for code, child_lo, child_hi in children:
+                check[b + code] = state
+                stack.append((b + code, depth + 1, child_lo, child_hi))
+            if attempts > MAX_PLACEMENT_ATTEMPTS:
+                # 前面的空位已经很碎，之后不再从这里开始尝试，换取线性的构建时间
+                first_free = position
+            while first_free < len(check) and check[first_free] != -1:
+                first_free += 1
+ 
+        # 去掉末尾未使用的空间，转为紧凑的整型数组
+        size = len(check)
+        while size > 1 and check[size - 1] == -1:
+            size -= 1
+        self.base = array('i', base[:size])
+        self.check = array('i', check[:size])
+        self.value = array('i', value[:size])
+ 
+    def search(self, word):
+        state = 0
+        for char in word:
+            code = self.codes.get(char)
+            if code is None:
+                return False
+            t = self.base[state] + code
+            if t >= len(self.check) or self.check[t] != state:
+                return False
+            state = t
+        return self.value[state] >= 0
+ 
+    def find_spans(self, text):
+        """返回所有命中记录 (start, end, word_id)，允许重叠"""
+        if not self.prefilter.may_match(text):
+            return []
+        base = self.base
+        check = self.check
+        value = self.value
+        size = len(check)
+        # 词库中未出现的字符编码为 0
+        text_codes = [self.codes.get(char, 0) for char in text]
+        result = []
+        for i in range(len(text_codes)):
+            state = 0
+            for j in range(i, len(text_codes)):
+                code = text_codes[j]
+                if not code:
+                    break
+                t = base[state] + code
+                if t >= size or check[t] != state:
+                    break
+                state = t
+                if value[state] >= 0:
+                    result.append((i, j, value[state]))
+        return result
+ 
+ 
+def build_tree(words):
     tree = Tree()
-    for word in words:
-        tree.insert(word)
- 
-    result = []
-    for i in range(len(text)):
-        node = tree.root
-        for j in range(i, len(text)):
-            if text[j] not in node.children:
-                break
-            node = node.children[text[j]]
-            if node.is_end:
-                result.append((i, j))
-    for start_index, end_index in result[::-1]:
-        text = text[:start_index] + '*' * (end_index - start_index + 1) + text[end_index + 1:]
-    return text
+    for word_id, word in enumerate(words):
+        if word:
+            tree.insert(word, word_id)
+    return tree
+ 
+ 
+def find_spans(text, words, policy='all'):
+    trie = get_matcher('trie_tree', words, DoubleArrayTrie)
+    return select_spans(trie.find_spans(text), policy)
+ 
+ 
+def trie_tree_filter_words(text, words):
+    trie = get_matcher('trie_tree', words, DoubleArrayTrie)
+    return mask_spans(text, trie.find_spans(text))
  
  
\ No newline at end of file
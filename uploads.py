@@ -0,0 +1,61 @@
+"""
+按内容寻址的音频上传存储
+上传内容按固定大小的块写入临时文件，同时计算 SHA-256，最后以 <sha256><扩展名> 命名；
+相同内容只保存一份，重复上传直接复用已有文件（以及基于内容哈希的转录缓存）
+"""
+
+import os
+import re
+import hashlib
+import tempfile
+
+# 每次从上传流读取的字节数
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+ALLOWED_EXTENSIONS = {'.mp3', '.wav', '.m4a', '.flac', '.ogg'}
+
+_SHA256_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+
+def stored_name(digest, ext):
+    return f"{digest}{ext}"
+
+
+def find_upload(folder, digest, ext):
+    """按内容哈希查找已保存的上传文件，不存在时返回 None"""
+    digest = digest.lower()
+    if not _SHA256_PATTERN.match(digest) or ext not in ALLOWED_EXTENSIONS:
+        return None
+    filename = stored_name(digest, ext)
+    if os.path.exists(os.path.join(folder, filename)):
+        return filename
+    return None
+
+
+def save_upload(stream, folder, ext, chunk_size=UPLOAD_CHUNK_SIZE):
+    """
+    分块写入并计算哈希，返回 (文件名, 内容哈希, 字节数, 是否已存在)
+    已存在相同内容时丢弃临时文件
+    """
+    sha = hashlib.sha256()
+    size = 0
+    fd, temp_path = tempfile.mkstemp(dir=folder, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in iter(lambda: stream.read(chunk_size), b''):
+                sha.update(chunk)
+                f.write(chunk)
+                size += len(chunk)
+        digest = sha.hexdigest()
+        filename = stored_name(digest, ext)
+        filepath = os.path.join(folder, filename)
+        if os.path.exists(filepath):
+            os.remove(temp_path)
+            return filename, digest, size, True
+        # 同时上传相同内容时，替换的也是相同的内容
+        os.replace(temp_path, filepath)
+        return filename, digest, size, False
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise